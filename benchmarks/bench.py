@@ -0,0 +1,162 @@
+#
+# Created on Sun Oct 18 2026
+#
+# Copyright (c) 2026 Super Lee
+#
+
+"""
+端到端性能基准: 通过本地模拟服务器获取记录的速度、单页解析耗时、不同数据量下的统计和绘图耗时
+用法: python benchmarks/bench.py [--records 2000] [--sizes 1000,100000,1000000] [--json result.json]
+"""
+
+import argparse
+import json
+import logging
+import sys
+import tempfile
+import time
+import warnings
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from rich.console import Console
+from rich.table import Table
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from mock_server import PLACES, TYPES, MockServer, generate_records  # noqa: E402
+
+console = Console()
+
+
+def timed(func, *args, repeat=1, **kwargs):
+    """运行 repeat 次，返回 (最短耗时, 最后一次的结果)"""
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def generate_frame(count, year=2024, seed=0):
+    """直接生成 count 条交易记录的 DataFrame，列类型与 load_records 的结果相同"""
+    from tju_expense.store import normalize_records
+
+    rng = np.random.default_rng(seed)
+    start = np.datetime64(f"{year}-01-01")
+    days = rng.integers(0, 365, count)
+    seconds = rng.integers(6 * 3600, 22 * 3600, count)
+    time_ = start + days.astype('timedelta64[D]') + seconds.astype('timedelta64[s]')
+    df = pd.DataFrame({
+        'time': np.sort(time_)[::-1],
+        'id': [f"{year}{i:016d}" for i in range(count)],
+        'type': np.array(TYPES)[rng.integers(0, len(TYPES), count)],
+        'amount': rng.uniform(1, 30, count).round(2),
+        'place': np.array(PLACES)[rng.integers(0, len(PLACES), count)],
+    })
+    return normalize_records(df)
+
+
+def bench_fetch(records, workers, latency):
+    """通过模拟服务器完整获取 records 条记录"""
+    from tju_expense.fetch import Fetcher
+
+    server = MockServer(records=records, latency=latency).start()
+    try:
+        results = {}
+        for name in ('get_records', 'get_batch'):
+            fetcher = Fetcher("benchmark", workers=workers, base_url=server.base_url)
+            fetcher.progress = False
+            seconds, fetched = timed(getattr(fetcher, name), "2024-01-01", "2024-12-31")
+            fetcher.close()
+            assert len(fetched) == records, f"{name} 获取到 {len(fetched)} 条记录, 应为 {records} 条"
+            results[name] = {'seconds': seconds, 'records_per_second': records / seconds}
+        return results
+    finally:
+        server.stop()
+
+
+def bench_parse(repeat):
+    """解析一页 10 条记录的耗时"""
+    from tju_expense.parse import PARSER, parse_records, parse_rows
+    from mock_server import PAGER, QUERY_PAGE, ROW, CSRF
+
+    rows = "".join(
+        ROW.format(time=time_, id=id_, type=type_, amount=amount, place=place)
+        for time_, id_, type_, amount, place in generate_records(10, "2024-01-01", "2024-12-31")
+    )
+    html = QUERY_PAGE.format(csrf=CSRF, rows=rows, pager=PAGER.format(page=1, page_cnt=1, count=10))
+    results = {'parser': PARSER}
+    for func in (parse_rows, parse_records):
+        seconds, _ = timed(lambda: [func(html) for _ in range(100)], repeat=repeat)
+        results[func.__name__] = {'ms_per_page': seconds * 10}
+    return results
+
+
+def bench_analysis(size, dpi, render):
+    """size 条记录的统计和绘图耗时"""
+    from tju_expense.dataset import Dataset
+    from tju_expense.stats import compute_statistics
+
+    df = generate_frame(size)
+    results = {}
+    results['dataset'], data = timed(Dataset, df)
+    results['statistics'], _ = timed(compute_statistics, data)
+    if render:
+        import matplotlib
+        matplotlib.use('Agg')
+        from tju_expense.analyze import analyze, register_font
+        register_font()
+        with tempfile.TemporaryDirectory() as tmp:
+            results['render'], panels = timed(analyze, data, title="基准测试", save_to=Path(tmp) / "bench.png", dpi=dpi)
+        results['panels'] = panels
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark fetching, parsing and analysis')
+    parser.add_argument('--records', type=int, default=2000, help='Records served by the mock server')
+    parser.add_argument('--workers', type=int, default=4, help='Concurrent page requests')
+    parser.add_argument('--latency', type=float, default=0.0, help='Extra delay of every mock request in seconds')
+    parser.add_argument('--sizes', default='1000,100000,1000000', help='Comma-separated record counts for analysis')
+    parser.add_argument('--dpi', type=int, default=100, help='Resolution of the rendered chart')
+    parser.add_argument('--no-render', action='store_true', help='Skip chart rendering')
+    parser.add_argument('--repeat', type=int, default=3, help='Repetitions of the parse benchmark')
+    parser.add_argument('--json', help='Write the results to this JSON file')
+    args = parser.parse_args()
+
+    logging.getLogger('matplotlib').setLevel(logging.ERROR)
+    warnings.filterwarnings('ignore')
+
+    results = {}
+    with console.status("正在测试获取速度..."):
+        results['fetch'] = bench_fetch(args.records, args.workers, args.latency)
+    with console.status("正在测试解析速度..."):
+        results['parse'] = bench_parse(args.repeat)
+    results['analysis'] = {}
+    for size in (int(size) for size in args.sizes.split(',')):
+        with console.status(f"正在测试 {size} 条记录的统计和绘图..."):
+            results['analysis'][size] = bench_analysis(size, args.dpi, not args.no_render)
+
+    table = Table(title="性能基准")
+    table.add_column("项目", justify="left", style="cyan")
+    table.add_column("结果", justify="right", style="magenta")
+    for name, value in results['fetch'].items():
+        table.add_row(f"{name} ({args.records} 条)", f"{value['records_per_second']:.0f} 条/秒")
+    for name in ('parse_rows', 'parse_records'):
+        table.add_row(f"{name} ({results['parse']['parser']})", f"{results['parse'][name]['ms_per_page']:.2f} ms/页")
+    for size, value in results['analysis'].items():
+        for stage in ('dataset', 'statistics', 'render'):
+            if stage in value:
+                table.add_row(f"{stage} ({size} 条)", f"{value[stage]:.2f}s")
+    console.print(table)
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding='utf-8')
+        console.log(f"结果已保存到 {args.json}")
+
+
+if __name__ == "__main__":
+    main()
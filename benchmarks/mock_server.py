@@ -0,0 +1,207 @@
+#
+# Created on Sun Oct 18 2026
+#
+# Copyright (c) 2026 Super Lee
+#
+
+"""
+本地模拟的校园卡网站，提供 personaccount/index 和 consume/query 两个页面
+用法: python benchmarks/mock_server.py --records 5000 --latency 0.05
+然后: Fetcher(cookie, base_url="http://127.0.0.1:8180")
+"""
+
+import argparse
+import random
+import threading
+import time
+
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+CSRF = "mock-csrf-token"
+PAGE_SIZE = 10
+
+TYPES = ["餐费支出"] * 8 + ["水费支出", "电费支出"]
+PLACES = [
+    "北洋园一食堂", "北洋园二食堂", "北洋园三食堂", "北洋园四食堂", "北洋园五食堂",
+    "卫津路学一食堂", "卫津路学三食堂", "卫津路留园", "北洋园超市", "北洋园水控",
+]
+# 餐费的消费时刻集中在三餐时间
+HOURS = [7, 8, 9, 11, 11, 12, 12, 13, 17, 17, 18, 18, 19, 21]
+
+ACCOUNT_PAGE = """<html><head><meta name="_csrf" content="{csrf}"/></head><body>
+<table>
+<tr><td>学工号</td><td>{stuid}</td></tr>
+<tr><td>姓名</td><td>{name}</td></tr>
+<tr><td>现金资金</td><td>{balance}元</td></tr>
+</table></body></html>"""
+
+LOGIN_PAGE = """<html><head><title>登录</title></head><body>请登录</body></html>"""
+
+QUERY_PAGE = """<html><head><meta name="_csrf" content="{csrf}"/></head><body>
+<form><table><tr><td>创建时间</td><td><input name="starttime"/> 至 <input name="endtime"/></td></tr></table></form>
+<table><thead><tr><th>交易时间</th><th>类型</th><th>地点</th><th>金额</th><th>资金</th><th>状态</th><th>操作</th></tr></thead>
+<tbody>
+{rows}{pager}</tbody></table>
+<table><tr><td>创建时间</td></tr></table>
+</body></html>"""
+
+ROW = """<tr><td>{time}</td><td>{type}<br/>交易号：{id}</td><td>{place}</td><td>{amount}</td><td>现金</td><td>交易成功</td><td><a href="#">详情</a></td></tr>
+"""
+
+PAGER = """<tr><td colspan="7">当前第 {page} 页 共 {page_cnt} 页 共 {count} 条记录</td></tr>
+"""
+
+
+def generate_records(count, start, end, seed=0):
+    """
+    生成 [start, end] 内的 count 条交易记录，按时间倒序排列，与真实页面相同
+    :return: (时间, 交易号, 类型, 金额, 地点) 元组列表，时间和金额为页面中的原始文本
+    """
+    rng = random.Random(f"{seed}-{start}-{end}")
+    start, end = date.fromisoformat(start), date.fromisoformat(end)
+    days = (end - start).days + 1
+    records = []
+    for _ in range(count):
+        type_ = rng.choice(TYPES)
+        moment = datetime.combine(start + timedelta(days=rng.randrange(days)), datetime.min.time())
+        if type_ == "餐费支出":
+            moment += timedelta(hours=rng.choice(HOURS), minutes=rng.randrange(60), seconds=rng.randrange(60))
+            place = rng.choice(PLACES[:8])
+            amount = round(rng.uniform(3, 25), 2)
+        else:
+            moment += timedelta(hours=rng.randrange(8, 23), minutes=rng.randrange(60), seconds=rng.randrange(60))
+            place = PLACES[9] if type_ == "水费支出" else "电控"
+            amount = round(rng.uniform(5, 50), 2)
+        records.append((moment, type_, place, amount))
+    records.sort(reverse=True)
+    return [
+        (moment.strftime("%Y.%m.%d %H%M%S"), f"{moment:%Y%m%d%H%M%S}{i:06d}", type_, f"{amount:.2f}", place)
+        for i, (moment, type_, place, amount) in enumerate(records)
+    ]
+
+
+class MockServer(ThreadingHTTPServer):
+    """
+    :param records: [start, end] 内的交易记录总数，查询时按日期筛选
+    :param latency: 每次请求的额外延迟（秒）
+    :param invalid_rate: 返回缺少分页信息的不完整页面的概率
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address=("127.0.0.1", 0), records=1000, latency=0.0, invalid_rate=0.0, seed=0,
+                 start="2024-01-01", end="2024-12-31"):
+        super().__init__(address, MockHandler)
+        self.records = generate_records(records, start, end, seed)
+        self.latency = latency
+        self.invalid_rate = invalid_rate
+        self.seed = seed
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.lock = threading.Lock()
+        self.query = lru_cache(maxsize=32)(self.generate)
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def generate(self, start, end):
+        return [record for record in self.records if start <= record[0][:10].replace(".", "-") <= end]
+
+    def start(self):
+        """在后台线程中运行，返回自身以便链式调用"""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_html(self, html, status=200):
+        body = html.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html;charset=UTF-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def begin(self):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            invalid = server.random.random() < server.invalid_rate
+        if server.latency:
+            time.sleep(server.latency)
+        logged_in = "JSESSIONID=" in self.headers.get("Cookie", "")
+        return logged_in, invalid
+
+    def do_GET(self):
+        logged_in, _ = self.begin()
+        if not self.path.startswith("/epay/personaccount/index"):
+            self.send_html(LOGIN_PAGE, 404)
+        elif not logged_in:
+            self.send_html(LOGIN_PAGE)
+        else:
+            self.send_html(ACCOUNT_PAGE.format(csrf=CSRF, stuid="3020000000", name="测试", balance="123.45"))
+
+    def do_POST(self):
+        logged_in, invalid = self.begin()
+        length = int(self.headers.get("Content-Length", 0))
+        form = {key: values[0] for key, values in parse_qs(self.rfile.read(length).decode("utf-8")).items()}
+        if not self.path.startswith("/epay/consume/query"):
+            self.send_html(LOGIN_PAGE, 404)
+            return
+        if not logged_in or form.get("_csrf") != CSRF:
+            self.send_html(LOGIN_PAGE)
+            return
+
+        records = self.server.query(form.get("starttime", ""), form.get("endtime", ""))
+        page = int(form.get("pageNo", 1))
+        offset = int(form.get("pager.offset", (page - 1) * PAGE_SIZE))
+        page_records = records[offset:offset + PAGE_SIZE]
+        page_cnt = max(1, (len(records) + PAGE_SIZE - 1) // PAGE_SIZE)
+
+        rows = "".join(
+            ROW.format(time=time_, id=id_, type=type_, amount=amount, place=place)
+            for time_, id_, type_, amount, place in page_records
+        )
+        pager = PAGER.format(page=page, page_cnt=page_cnt, count=len(records)) if records else ""
+        if invalid:
+            # 模拟服务器过载时返回的缺少分页信息的页面
+            pager = ""
+        self.send_html(QUERY_PAGE.format(csrf=CSRF, rows=rows, pager=pager))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local mock of the campus card website')
+    parser.add_argument('--port', type=int, default=8180)
+    parser.add_argument('--records', type=int, default=1000, help='Number of records between --start and --end')
+    parser.add_argument('--start', default='2024-01-01', help='First day of the generated records')
+    parser.add_argument('--end', default='2024-12-31', help='Last day of the generated records')
+    parser.add_argument('--latency', type=float, default=0.0, help='Extra delay of every request in seconds')
+    parser.add_argument('--invalid-rate', type=float, default=0.0, help='Probability of returning a page without the pager row')
+    args = parser.parse_args()
+
+    server = MockServer(("127.0.0.1", args.port), args.records, args.latency, args.invalid_rate,
+                        start=args.start, end=args.end)
+    print(f"Serving on {server.base_url}, use any Cookie value")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
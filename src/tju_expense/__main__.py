@@ -4,21 +4,23 @@
 # Copyright (c) 2024 Super Lee
 #
 
+from tju_expense.timings import timings
+
 import os
 import sys
 import argparse
+import multiprocessing
 import re
-import pandas as pd
 from pathlib import Path
 from dotenv import load_dotenv
-from datetime import datetime
-from matplotlib import font_manager
+from datetime import date, datetime, timedelta
 from rich.console import Console
 from rich.prompt import Prompt
-from tju_expense.analyze import analyze, print_statistics
-from tju_expense.fetch import URLS, Fetcher
+from tju_expense.constants import FORMATS, REPORT_FORMATS, URLS
 from importlib.metadata import version
 
+# 较重的依赖 (requests, pandas, matplotlib, seaborn) 在用到它们的阶段才导入
+
 console = Console()
 error_console = Console(stderr=True)
 
@@ -26,14 +28,38 @@ def get_args():
     """Get command line arguments, including Cookie value and date range"""
     parser = argparse.ArgumentParser(description='Fetch and analyze transaction data')
     parser.add_argument('--cookie', help='Login Cookie')
-    parser.add_argument('--year', help='Year')
+    parser.add_argument('--year', help='Year (comma-separated list in batch mode)')
+    parser.add_argument('--start', help='Start date (YYYY-MM-DD) of an arbitrary range, served from the monthly history store')
+    parser.add_argument('--end', help='End date (YYYY-MM-DD) of the range, defaults to today')
+    parser.add_argument('--days', type=int, help='Report on the last N days, served from the monthly history store')
+    parser.add_argument('--workers', type=int, default=4, help='Maximum number of pages fetched concurrently')
+    parser.add_argument('--rate', type=float, help='Maximum number of pages requested per second (default: unlimited)')
+    parser.add_argument('--page-cache', action='store_true', help='Keep compressed raw record pages in data/<stuid>/pages and reuse them')
+    parser.add_argument('--reparse', action='store_true', help='Rebuild the yearly data file instead of reusing it (fast with --page-cache)')
+    parser.add_argument('--format', choices=FORMATS, default='csv', help='Storage format of the parsed data (parquet/feather require pyarrow)')
+    parser.add_argument('--export-csv', action='store_true', help='Also export the parsed data as CSV')
+    parser.add_argument('--chunksize', type=int, help='Analyze the yearly data file in chunks of this many rows to bound memory')
+    parser.add_argument('--batch', help='File listing one Cookie or data/<stuid> directory per line; runs non-interactively')
+    parser.add_argument('--cohort', action='store_true', help='Aggregate the data of every data/<stuid> directory for --year; runs non-interactively')
+    parser.add_argument('--groups', help='CSV file of "stuid,group" lines (e.g. dorm or college) used to group --cohort results')
+    parser.add_argument('--processes', type=int, help='Number of chart rendering processes')
+    parser.add_argument('--dpi', type=int, default=300, help='Resolution of the generated chart')
+    parser.add_argument('--preview', action='store_true', help='Render a fast low-resolution preview chart')
+    parser.add_argument('--report-format', choices=REPORT_FORMATS, default='png',
+                        help='Chart output: raster png, vector svg, or a self-contained html report')
+    parser.add_argument('--timings', action='store_true', help='Report startup, import and per-stage timings')
+    parser.add_argument('--profile', help='Write a JSON trace of per-stage timings and counters to this file')
+    parser.add_argument('--profile-stage',
+                        help='Run cProfile around one stage: "login", "fetch records", "load data", "statistics", '
+                             '"charts", "rollups" (with --start/--end), "cohort" or "import <module>"')
+    parser.add_argument('--no-cache', action='store_true', help='Recompute statistics and charts even if the data has not changed')
     args = parser.parse_args()
 
     if not args.cookie:
         load_dotenv()
         args.cookie = os.getenv('COOKIE')
 
-    if not args.cookie:
+    if not args.cookie and not args.batch and not args.cohort:
         console.log("未定义 Cookie, 请根据以下步骤获取 Cookie:")
         console.print(f"1. 使用浏览器访问天津大学财务处官网 {URLS['finance']} , 点击\"一卡通服务平台\" (或直接访问校园卡网站 {URLS['login']} ) 并登录")
         console.print("2. F12 打开 开发者工具 - Application - Storage - Cookies, 拷贝其中 JSESSIONID 的 Value")
@@ -44,25 +70,35 @@ def get_args():
 
     return args
 
-def get_font_path():
-    if getattr(sys, 'frozen', False):
-        # 如果是打包后的可执行文件
-        base_path = Path(sys._MEIPASS) / "tju_expense"
+def get_range(args, current_date):
+    """根据 --start/--end/--days 计算统计区间"""
+    today = current_date.date()
+    end = date.fromisoformat(args.end) if args.end else today
+    if args.start:
+        start = date.fromisoformat(args.start)
     else:
-        # 如果是开发环境
-        base_path = Path(__file__).parent
+        start = end - timedelta(days=args.days - 1)
+    return start.isoformat(), end.isoformat()
 
-    return base_path / "LXGWWenKaiLite-Regular.ttf"
+def save_profile(args):
+    """按 --timings/--profile 打印或保存各阶段的耗时和计数器"""
+    if args.timings:
+        timings.print(console)
+    if args.profile:
+        timings.save(args.profile)
+        console.log(f"耗时记录已保存到 {args.profile}")
+    if timings.profiled:
+        console.log(f"{args.profile_stage} 阶段的 cProfile 结果已保存到 {timings.profile_file}")
+    elif args.profile_stage:
+        # 阶段名称有误，或者该阶段被跳过（如图表已缓存），没有生成新的结果
+        console.log(f"[yellow]{args.profile_stage} 阶段没有运行, 未生成 cProfile 结果")
 
 def main():
     """Main program flow"""
+    timings.add("startup", timings.elapsed())
     console.rule(f"[bold]TJU Expense[/bold] [dim]v{version('tju-expense')}[/dim]")
     console.rule(f"[italic]{URLS['repo']}")
 
-    # 设置字体
-    font_path = get_font_path()
-    font_manager.fontManager.addfont(str(font_path))
-
     # Set up directory structure
     data_dir = Path("data")
     data_dir.mkdir(exist_ok=True)
@@ -70,8 +106,37 @@ def main():
     # Get Cookie
     args = get_args()
 
+    if args.profile_stage:
+        profile_file = Path(args.profile).with_suffix('.prof') if args.profile else Path('profile.prof')
+        timings.enable_profile(args.profile_stage, profile_file)
+
+    current_date = datetime.now()
+    default_year = str(current_date.year - 1) if current_date.month <= 1 else str(current_date.year)
+
+    if args.batch:
+        batch = timings.load('tju_expense.batch')
+        years = re.findall(r'20\d{2}', args.year or '') or [default_year]
+        failed = batch.run_batch(batch.read_batch_file(args.batch), years, data_dir, fmt=args.format,
+                           workers=args.workers, processes=args.processes, dpi=args.dpi, preview=args.preview,
+                           report_format=args.report_format)
+        save_profile(args)
+        sys.exit(1 if failed else 0)
+
+    if args.cohort:
+        cohort = timings.load('tju_expense.cohort')
+        year_match = re.search(r'20\d{2}', args.year or '')
+        year = year_match.group() if year_match else default_year
+        groups = cohort.read_groups(args.groups) if args.groups else None
+        with timings.stage("cohort"):
+            summary = cohort.run_cohort(data_dir, year, processes=args.processes, groups=groups)
+            cohort.print_cohort(summary)
+        save_profile(args)
+        sys.exit(0)
+
+    fetch = timings.load('tju_expense.fetch')
     try:
-        fetcher = Fetcher(args.cookie)
+        with timings.stage("login"):
+            fetcher = fetch.Fetcher(args.cookie, workers=args.workers, rate=args.rate)
     except ConnectionError as e:
         error_console.log(f"[red]{e}")
         sys.exit(1)
@@ -81,55 +146,125 @@ def main():
 
     user_dir = data_dir / user_info['stuid']
     user_dir.mkdir(exist_ok=True)
+    if args.page_cache:
+        fetcher.page_cache = timings.load('tju_expense.cache').PageCache(user_dir / 'pages')
 
-    input_year = None
-    current_date = datetime.now()
-    default_year = str(current_date.year - 1) if current_date.month <= 1 else str(current_date.year)
-    if args.year:
-        input_year = args.year
-    else:
-        input_year = Prompt.ask(
-            f"请输入统计年份 [dim](回车默认 {default_year})[/dim]",
-            default=default_year,
-            show_default=False
-        )
-
-    year_match = re.search(r'20\d{2}', input_year)
-    if year_match:
-        year = year_match.group()
-    else:
-        year = default_year
-        error_console.log(f"[red]无法解析输入的年份: {input_year}, 本次将统计默认年份数据, 请稍后重试并输入 4 位数字的年份")
+    stats = timings.load('tju_expense.stats')
+    store = timings.load('tju_expense.store')
 
-    start, end = f"{year}-01-01", f"{year}-12-31"
-    console.rule(f"[bold]{year} 年")
-    console.log(f"正在获取 {year} 年的数据...")
+    if args.start or args.days:
+        # 任意区间: 从按月分区的历史数据中读取, 只获取缺失的部分
+        try:
+            start, end = get_range(args, current_date)
+        except ValueError as e:
+            error_console.log(f"[red]无法解析输入的日期: {e}")
+            sys.exit(1)
+        period = f"{start} ~ {end}"
+        report_name = period
+        filename = f"{start}_{end}"
+        title = f"在天大的 {period}"
+        console.rule(f"[bold]{period}")
+        console.log(f"正在获取 {period} 的数据...")
 
-    filename = f"{year}"
-    parsed_file = user_dir / f"{filename}.csv"
-    if parsed_file.exists():
-        console.log(f"数据已经存在: {parsed_file}\n")
+        history = timings.load('tju_expense.history').HistoryStore(user_dir, args.format)
+        with timings.stage("fetch records"):
+            added = history.sync(fetcher, start, end)
+        console.log(f"新增 {added} 条交易记录\n")
+        with timings.stage("rollups"):
+            # 统计结果和图表由按月保存的预聚合结果合并得到，只读取首尾不完整月份的记录
+            data = history.dataset(start, end)
+        csv_file = user_dir / f"{filename}.csv"
+        if args.export_csv:
+            store.save_records(history.query(start, end), csv_file)
+            console.log(f"数据已导出到 {csv_file}")
     else:
-        records = fetcher.get_records(start=start, end=end)
-        df = pd.DataFrame(records)
-        df.to_csv(parsed_file, index=False, encoding='utf-8')
-        console.log(f"数据已保存到 {parsed_file}")
+        input_year = None
+        if args.year:
+            input_year = args.year
+        else:
+            input_year = Prompt.ask(
+                f"请输入统计年份 [dim](回车默认 {default_year})[/dim]",
+                default=default_year,
+                show_default=False
+            )
 
-    print_statistics(parsed_file)
+        year_match = re.search(r'20\d{2}', input_year)
+        if year_match:
+            year = year_match.group()
+        else:
+            year = default_year
+            error_console.log(f"[red]无法解析输入的年份: {input_year}, 本次将统计默认年份数据, 请稍后重试并输入 4 位数字的年份")
 
-    with console.status("[bold green]正在绘制年度总结图表...") as status:
-        fig_file = user_dir / f"{filename}.png"
-        try:
-            analyze_result = analyze(parsed_file, title=f"在天大的{year}", save_to=fig_file)
-        except ValueError as e:
-            console.log(f"{year} 年暂时还没有足够多的数据可以绘制图表, 请今年晚些再来看哦!")
-            analyze_result = False
-        if analyze_result:
-            console.log(f"年度总结图表绘制完成! 已保存到 {fig_file}")
+        console.rule(f"[bold]{year} 年")
+        console.log(f"正在获取 {year} 年的数据...")
+
+        period = f"{year} 年"
+        report_name = f"{year} 年度"
+        filename = f"{year}"
+        title = f"在天大的{year}"
+        with timings.stage("fetch records"):
+            parsed_file = store.prepare_records(fetcher, user_dir, year, args.format, current_date.strftime("%Y-%m-%d"),
+                                                refresh=args.reparse)
+
+        csv_file = user_dir / f"{filename}.csv"
+        if args.export_csv and parsed_file != csv_file:
+            store.save_records(store.load_records(parsed_file), csv_file)
+            console.log(f"数据已导出到 {csv_file}")
+
+        with timings.stage("load data"):
+            if args.chunksize:
+                # 分块读取并合并聚合结果，不在内存中保留全部记录
+                data = timings.load('tju_expense.chunked').load_chunked(parsed_file, args.chunksize)
+            else:
+                data = stats.load_dataset(parsed_file)
+
+    # 数据和参数都没有变化时沿用上次的统计结果和图表
+    report_cache = None if args.no_cache else timings.load('tju_expense.cache').ReportCache(user_dir / filename)
+    with timings.stage("statistics"):
+        cached = report_cache is not None and not data.empty and report_cache.load_statistics(data)
+        stats.print_statistics(data)
+        if report_cache is not None and not data.empty and not cached:
+            report_cache.save_statistics(data)
+
+    fig_file = user_dir / f"{filename}.{args.report_format}"
+    render_key = None
+    if report_cache is not None and not data.empty:
+        render_key = report_cache.render_key(data, title=title, dpi=args.dpi, preview=args.preview,
+                                             format=args.report_format)
+
+    if render_key is not None and report_cache.is_rendered(render_key, fig_file):
+        console.log(f"数据没有变化, 年度总结图表无需重新绘制: {fig_file}")
+    else:
+        with console.status("[bold green]正在绘制年度总结图表...") as status:
+            # 只需要保存图片，使用非交互式后端，并在绘图前才注册字体
+            with timings.stage("import matplotlib"):
+                import matplotlib
+                matplotlib.use('Agg')
+            analyze = timings.load('tju_expense.analyze')
+            analyze.register_font()
+            try:
+                with timings.stage("charts"):
+                    analyze_result = analyze.analyze(data, title=title, save_to=fig_file,
+                                                     dpi=args.dpi, workers=args.processes, preview=args.preview,
+                                                     format=args.report_format)
+            except ValueError as e:
+                console.log(f"{period}暂时还没有足够多的数据可以绘制图表, 请晚些再来看哦!")
+                analyze_result = False
+            if analyze_result:
+                console.log(f"年度总结图表绘制完成! 已保存到 {fig_file}")
+                panel_timings = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in analyze_result.items())
+                console.log(f"[dim]子图绘制耗时: {panel_timings}")
+                if render_key is not None:
+                    report_cache.save_render(render_key, fig_file, analyze_result)
+
+    save_profile(args)
 
     console.rule()
-    console.input(f"[green]以上是你的 {year} 年度消费报告, 请查收![/green] [dim]按 Enter 退出...[/dim]")
+    console.input(f"[green]以上是你的 {report_name} 消费报告, 请查收![/green] [dim]按 Enter 退出...[/dim]")
 
 
 if __name__ == "__main__":
+    # PyInstaller 打包后子进程以 spawn 方式启动同一个可执行文件，需要在 main() 之前交给 multiprocessing 处理，
+    # 否则 --batch、--processes、--cohort 的每个子进程都会重新运行命令行
+    multiprocessing.freeze_support()
     main()
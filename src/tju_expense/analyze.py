@@ -4,81 +4,169 @@
 # Copyright (c) 2024 Super Lee
 #
 
-import pandas as pd
+import atexit
+import html
+import io
+import os
+import sys
+import time
+import numpy as np
+import matplotlib.image as mpimg
 import matplotlib.pyplot as plt
 import seaborn as sns
+from concurrent.futures import ProcessPoolExecutor
+from matplotlib import font_manager
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from pathlib import Path
 from rich.console import Console
-from rich.table import Table
+from tju_expense.dataset import load_dataset
+from tju_expense.timings import timings as counters
+from tju_expense.stats import print_statistics  # noqa: F401
 
 
 console = Console()
 
 
-def analyze(df_file, title, save_to):
-    """分析交易数据并生成可视化图表"""
-    try:
-        df = pd.read_csv(df_file)
-    except pd.errors.EmptyDataError as e:
-        console.log("没有数据")
-        return None
-
-    # 确保时间列为datetime类型
-    df['time'] = pd.to_datetime(df['time'])
-
-    plt.rcParams['font.sans-serif'] = ['LXGW WenKai Lite']  # 用来正常显示中文标签
-    plt.rcParams['axes.unicode_minus'] = False    # 用来正常显示负号
-    plt.rcParams['font.size'] = 14  # 设置全局字体大小为14（可以根据需要调整）
-
-    # 创建纵向图表布局
-    fig = plt.figure(figsize=(12, 16))
-    gs = plt.GridSpec(4, 3, figure=fig) # 必须要加 figure=fig
+def get_font_path():
+    if getattr(sys, 'frozen', False):
+        # 如果是打包后的可执行文件
+        base_path = Path(sys._MEIPASS) / "tju_expense"
+    else:
+        # 如果是开发环境
+        base_path = Path(__file__).parent
 
-    # 1. 消费热力图 (第一行，跨越所有列)
-    ax1 = fig.add_subplot(gs[0, :])
-    plot_consumption_heatmap(df, ax1, title)
+    return base_path / "LXGWWenKaiLite-Regular.ttf"
 
-    # 2. 每日消费趋势图 (第二行，跨越所有列)
-    ax2 = fig.add_subplot(gs[1, :])
-    plot_daily_trend(df, ax2)
 
-    # 3. 绘制每日消费散点图 (第三行，第一列)
-    ax3 = fig.add_subplot(gs[2, 0])
-    plot_daily_scatter(df, ax3)
+def register_font():
+    """注册图表使用的中文字体"""
+    font_manager.fontManager.addfont(str(get_font_path()))
 
-    # 4. 消费地点统计 (第三行，第二列)
-    ax4 = fig.add_subplot(gs[2, 1:])
-    plot_place_statistics(df, ax4)
 
-    # 5. 消费类型饼图 (第四行，第一列)
-    ax5 = fig.add_subplot(gs[3, 0])
-    plot_type_pie_chart(df, ax5)
-
-    # 6. 每月消费统计饼图 (第四行，第二列)
-    ax6 = fig.add_subplot(gs[3, 1])
-    plot_monthly_pie_chart(df, ax6)
+def setup_style():
+    """设置图表的全局样式"""
+    plt.rcParams['font.sans-serif'] = ['LXGW WenKai Lite']  # 用来正常显示中文标签
+    plt.rcParams['axes.unicode_minus'] = False    # 用来正常显示负号
+    plt.rcParams['font.size'] = 14  # 设置全局字体大小为14（可以根据需要调整）
 
-    # 7. 时段消费统计饼图 (第四行，第三列)
-    ax7 = fig.add_subplot(gs[3, 2])
-    plot_time_slot_pie_chart(df, ax7)
 
-    plt.tight_layout()
-    plt.savefig(save_to, dpi=300, bbox_inches='tight')
-    return True
+def init_render_worker():
+    """绘图子进程的初始化函数"""
+    register_font()
+    setup_style()
+
+
+_render_pool = None
+_render_workers = None
+
+
+def get_render_pool(workers):
+    """
+    返回绘图进程池，同一进程中多次调用 analyze 时复用，避免每次都重新启动子进程和加载字体
+    进程数变化时才重新创建
+    :param workers: 进程数
+    """
+    global _render_pool, _render_workers
+    if _render_pool is not None and _render_workers != workers:
+        shutdown_render_pool()
+    if _render_pool is None:
+        _render_pool = ProcessPoolExecutor(max_workers=workers, initializer=init_render_worker)
+        _render_workers = workers
+    return _render_pool
+
+
+@atexit.register
+def shutdown_render_pool():
+    """关闭绘图进程池"""
+    global _render_pool
+    if _render_pool is not None:
+        _render_pool.shutdown()
+        _render_pool = None
+
+
+def analyze(data, title, save_to, dpi=300, workers=None, preview=False, format=None):
+    """
+    分析交易数据并生成可视化图表
+    每个子图单独绘制成图块后按 LAYOUT 拼接，互不依赖，可以并行
+    :param save_to: 文件路径或二进制缓冲区（如 io.BytesIO）
+    :param dpi: 输出分辨率
+    :param workers: 并行绘图的进程数，为空或只有一个 CPU 核时在当前进程依次绘制；进程池在多次调用之间复用
+    :param preview: 快速预览模式，降低分辨率并跳过自动布局
+    :param format: 图片格式，默认由扩展名决定，写入缓冲区时为 png；svg 在同一个 Figure 上绘制矢量图，
+                   html 为内嵌该矢量图和汇总数据的单个网页
+    :return: 每个子图的绘制耗时（秒）
+    """
+    data = load_dataset(data)
+    if data.empty:
+        console.log("没有数据")
+        return None
 
-def plot_consumption_heatmap(df, ax, title):
+    setup_style()
+    if format is None and isinstance(save_to, (str, Path)):
+        format = Path(save_to).suffix.lstrip('.') or None
+    if format in ('svg', 'html'):
+        start = time.perf_counter()
+        with counters.timer('save_ms'):
+            if format == 'svg':
+                render_figure(data, title).savefig(save_to, format='svg')
+            else:
+                write_output(save_to, render_html(data, title).encode('utf-8'))
+        return {'figure': time.perf_counter() - start}
+    if preview:
+        dpi = min(dpi, PREVIEW_DPI)
+    stats = data.statistics
+
+    tiles, timings = {}, {}
+    # 进程数超过 CPU 核数只会互相争抢，单核时直接在当前进程绘制
+    workers = min(workers or 0, os.cpu_count() or 1)
+    pool = get_render_pool(workers) if workers > 1 else None
+    futures = {}
+    for name, (_, _, needs_rows) in PANELS.items():
+        if pool is not None and not needs_rows:
+            # 只把聚合结果传给子进程，避免序列化全部原始记录
+            futures[name] = pool.submit(render_panel, name, Summary(stats), title, dpi, preview)
+    for name, (_, _, needs_rows) in PANELS.items():
+        if name not in futures:
+            tiles[name], timings[name] = render_panel(name, data, title, dpi, preview)
+    for name, future in futures.items():
+        tiles[name], timings[name] = future.result()
+
+    # 按行拼接图块，每行的总宽度都是 12 英寸
+    image = np.vstack([np.hstack([tiles[name] for name in row]) for row in LAYOUT])
+    with counters.timer('save_ms'):
+        mpimg.imsave(save_to, image, dpi=dpi, format=format or 'png')
+    for name, seconds in timings.items():
+        counters.count(f'render_ms.{name}', seconds * 1000)
+    return timings
+
+def write_output(save_to, content):
+    if isinstance(save_to, (str, Path)):
+        Path(save_to).write_bytes(content)
+    else:
+        save_to.write(content)
+
+
+def downsample_minmax(x, y, buckets):
+    """
+    按顺序把序列等分为 buckets 段，每段只保留最小值和最大值两个点，折线的轮廓和峰值不变
+    点数不超过 2 * buckets 时原样返回
+    """
+    x, y = np.asarray(x), np.asarray(y, dtype=float)
+    if len(y) <= 2 * buckets:
+        return x, y
+    edges = np.linspace(0, len(y), buckets + 1).astype(int)
+    keep = []
+    for start, stop in zip(edges[:-1], edges[1:]):
+        segment = y[start:stop]
+        keep.extend(sorted({start + int(segment.argmin()), start + int(segment.argmax())}))
+    return x[keep], y[keep]
+
+
+def plot_consumption_heatmap(data, ax, title):
     """绘制消费热力图"""
-    # 准备数据
-    df['weekday'] = df['time'].dt.weekday
-    df['week'] = df['time'].dt.isocalendar().week
-
-    # 计算每天的消费总额
-    daily_consumption = df.pivot_table(
-        values='amount',
-        index='weekday',
-        columns='week',
-        aggfunc='sum',
-        fill_value=0
-    )
+    # 每天的消费总额
+    daily_consumption = data.statistics.heatmap
 
     # 设置颜色映射
     cmap = sns.color_palette("Blues", as_cmap=True)
@@ -101,10 +189,10 @@ def plot_consumption_heatmap(df, ax, title):
     ax.set_xlabel('')
     ax.set_yticklabels(['Mon', '', 'Wed', '', 'Fri', '', 'Sun'])
 
-def plot_daily_trend(df, ax):
+def plot_daily_trend(data, ax):
     """绘制每日消费趋势图"""
-    # 计算每日消费总额
-    daily_sum = df.groupby(df['time'].dt.date)['amount'].sum().reset_index()
+    # 每日消费总额
+    daily_sum = data.statistics.daily.reset_index()
 
     # 计算7日移动平均线
     daily_sum['MA7'] = daily_sum['amount'].rolling(
@@ -112,10 +200,10 @@ def plot_daily_trend(df, ax):
         min_periods=1  # 允许不足7天的数据也计算平均值
     ).mean()
 
-    # 绘制折线图和移动平均线
-    ax.plot(daily_sum['time'], daily_sum['amount'],
+    # 绘制折线图和移动平均线，跨越多年时每段只保留最高和最低点
+    ax.plot(*downsample_minmax(daily_sum['date'], daily_sum['amount'], TREND_BUCKETS),
             '#a1c9f4', label='日消费')
-    ax.plot(daily_sum['time'], daily_sum['MA7'],
+    ax.plot(*downsample_minmax(daily_sum['date'], daily_sum['MA7'], TREND_BUCKETS),
             '#00468c', label='7日平均', linewidth=2)
 
     # 设置标签
@@ -127,9 +215,10 @@ def plot_daily_trend(df, ax):
     # 旋转x轴日期标签
     plt.setp(ax.get_xticklabels(), rotation=45, ha='right')
 
-def plot_daily_scatter(df, ax):
+def plot_daily_scatter(data, ax):
     """绘制每日消费散点图"""
-    ax.scatter(df['time'].dt.hour + df['time'].dt.minute / 60, df['amount'], color='#6baed6', alpha=0.6)  # 修改为时间（0:00-24:00）
+    hours, amounts = data.scatter  # 修改为时间（0:00-24:00）
+    ax.scatter(hours, amounts, color='#6baed6', alpha=0.6)
 
     # 设置x轴刻度
     ax.set_xticks([0, 4, 8, 12, 16, 20, 24])  # 设置x轴刻度为0, 4, 8, 12, 16, 20, 24
@@ -140,13 +229,10 @@ def plot_daily_scatter(df, ax):
     ax.set_xlabel('时间')
     ax.set_ylabel('')
 
-def plot_place_statistics(df, ax):
+def plot_place_statistics(data, ax):
     """绘制消费地点统计柱状图"""
-    df = df[~df['type'].str.contains('水|电', na=False)]
-
-    # 统计每个地点的消费总额并取前10
-    place_stats = df.groupby('place')['amount'].sum()
-    place_stats = place_stats.nlargest(10).sort_values(ascending=True)
+    # 食堂消费地点的消费总额取前10
+    place_stats = data.statistics.places.nlargest(10).sort_values(ascending=True)
 
     # 绘制横向柱状图
     bars = place_stats.plot(
@@ -164,10 +250,10 @@ def plot_place_statistics(df, ax):
     for i, v in enumerate(place_stats):
         ax.text(v, i, f'{v:.2f}', va='center', fontsize=7)
 
-def plot_type_pie_chart(df, ax):
+def plot_type_pie_chart(data, ax):
     """绘制消费类型饼图"""
-    # 统计每种类型的消费总额
-    type_stats = df.groupby('type')['amount'].sum()
+    # 每种类型的消费总额
+    type_stats = data.statistics.types['sum']
 
     # 计算百分比
     total = type_stats.sum()
@@ -193,10 +279,10 @@ def plot_type_pie_chart(df, ax):
     plt.setp(autotexts, size=8, weight="bold")
     plt.setp(texts, size=8)
 
-def plot_monthly_pie_chart(df, ax):
+def plot_monthly_pie_chart(data, ax):
     """绘制每月消费统计饼图"""
-    # 统计每月消费总额
-    monthly_stats = df.groupby(df['time'].dt.to_period('M'))['amount'].sum()
+    # 每月消费总额
+    monthly_stats = data.statistics.monthly['sum']
 
     # 绘制饼图
     wedges, texts, autotexts = ax.pie(
@@ -213,24 +299,14 @@ def plot_monthly_pie_chart(df, ax):
     plt.setp(autotexts, size=8, weight="bold")
     plt.setp(texts, size=8)
 
-def plot_time_slot_pie_chart(df, ax):
+def plot_time_slot_pie_chart(data, ax):
     """绘制时段消费统计饼图"""
-    time_slots = {
-        '早餐': (5, 11),  # 5点到11点
-        '午餐': (11, 17),  # 11点到17点
-        '晚餐': (17, 24)  # 17点到24点
-    }
-
-    time_slot_stats = {}
-    filtered_df = df[~df['type'].str.contains('水|电', na=False)]
-    for slot, (start, end) in time_slots.items():
-        mask = (filtered_df['time'].dt.hour >= start) & (filtered_df['time'].dt.hour < end)
-        time_slot_stats[slot] = filtered_df[mask]['amount'].sum()
+    time_slot_stats = data.statistics.slots['sum']
 
     # 绘制饼图
     wedges, texts, autotexts = ax.pie(
-        time_slot_stats.values(),
-        labels=time_slot_stats.keys(),
+        time_slot_stats,
+        labels=time_slot_stats.index,
         autopct='%1.1f%%',
         startangle=90,
         pctdistance=0.85,
@@ -242,117 +318,119 @@ def plot_time_slot_pie_chart(df, ax):
     plt.setp(autotexts, size=8, weight="bold")
     plt.setp(texts, size=8)
 
-def print_statistics(df_file):
-    """打印基本统计信息"""
-    try:
-        df = pd.read_csv(df_file)
-    except pd.errors.EmptyDataError as e:
-        console.log("没有数据")
-        return None
-
-    df['time'] = pd.to_datetime(df['time'])
-
-    # 创建表格
-    table = Table(title="消费统计")
-
-    # 添加列
-    table.add_column("统计项", justify="left", style="cyan", no_wrap=True)
-    table.add_column("数值", justify="right", style="magenta")
-
-    # 添加行
-    table.add_row("总消费金额", f"{df['amount'].sum():.2f}元")
-    daily_average = df.groupby(df['time'].dt.date)['amount'].sum().mean()
-    table.add_row("平均每日消费", f"{daily_average:.2f}元")
-    table.add_row("平均每笔消费", f"{df['amount'].mean():.2f}元")
-    table.add_row("消费笔数", f"{len(df)}笔")
-
-    console.print(table, justify="center")
-
-    # 消费类型统计
-    type_stats = df.groupby('type')['amount'].agg(['count', 'sum', 'mean']).round(2)
-    type_table = Table(title="消费类型统计")
-
-    # 添加列
-    type_table.add_column("类型", justify="left", style="cyan", no_wrap=True)
-    type_table.add_column("笔数", justify="right", style="magenta")
-    type_table.add_column("总金额", justify="right", style="magenta")
-    type_table.add_column("平均金额", justify="right", style="magenta")
-
-    # 添加行
-    for index, row in type_stats.iterrows():
-        type_table.add_row(index, str(row['count']), f"{row['sum']:.2f}元", f"{row['mean']:.2f}元")
-
-    console.print(type_table, justify="center")
-
-    # 每月消费统计
-    monthly_stats = df.groupby(df['time'].dt.to_period('M'))['amount'].agg(['count', 'sum']).reset_index()
-    monthly_stats['time'] = monthly_stats['time'].dt.to_timestamp()  # 转换为时间戳以便显示
-    monthly_table = Table(title="每月消费统计")
-    monthly_table.add_column("月份", justify="left", style="cyan", no_wrap=True)
-    monthly_table.add_column("消费笔数", justify="right", style="magenta")
-    monthly_table.add_column("总金额", justify="right", style="magenta")
-
-    for index, row in monthly_stats.iterrows():
-        monthly_table.add_row(f"{row['time'].month}月", str(row['count']), f"{row['sum']:.2f}元")
-
-    console.print(monthly_table, justify="center")
-
-    # 时段消费统计
-    time_slots = {
-        '早餐': (5, 11),  # 5点到11点
-        '午餐': (11, 17),  # 11点到17点
-        '晚餐': (17, 24)  # 17点到24点
-    }
-
-    time_slot_stats = {}
-    filtered_df = df[~df['type'].str.contains('水|电', na=False)]
-    for slot, (start, end) in time_slots.items():
-        mask = (filtered_df['time'].dt.hour >= start) & (filtered_df['time'].dt.hour < end)
-        time_slot_stats[slot] = filtered_df[mask]['amount'].agg(['count', 'sum'])
-
-    time_slot_table = Table(title="时段消费统计")
-    time_slot_table.add_column("时段", justify="left", style="cyan", no_wrap=True)
-    time_slot_table.add_column("消费笔数", justify="right", style="magenta")
-    time_slot_table.add_column("总金额", justify="right", style="magenta")
-    time_slot_table.add_column("平均金额", justify="right", style="magenta")
-
-    for slot, stats in time_slot_stats.items():
-        avg_amount = stats['sum'] / stats['count'] if stats['count'] > 0 else 0
-        time_slot_table.add_row(slot, str(stats['count']), f"{stats['sum']:.2f}元", f"{avg_amount:.2f}元")
-
-    console.print(time_slot_table, justify="center")
-
-    # 单笔消费
-    max_transaction = df.loc[df['amount'].idxmax()]
-    max_pos_transaction = filtered_df.loc[filtered_df['amount'].idxmax()]
-    min_transaction = df.loc[df['amount'].idxmin()]
-    min_pos_transaction = filtered_df.loc[filtered_df['amount'].idxmin()]
-    earliest_transaction = df.loc[df['time'].idxmin()]
-    latest_transaction = df.loc[df['time'].idxmax()]
-    earliest_time_transaction = df.loc[df['time'].dt.time.idxmin()]
-    latest_time_transaction = df.loc[df['time'].dt.time.idxmax()]
-    earliest_time_pos_transaction = filtered_df.loc[filtered_df['time'].dt.time.idxmin()]
-    latest_time_pos_transaction = filtered_df.loc[filtered_df['time'].dt.time.idxmax()]
-
-    # 创建表格
-    transaction_table = Table(title="单笔消费极值")
-    transaction_table.add_column("类型", justify="left", style="cyan", no_wrap=True)
-    transaction_table.add_column("金额", justify="right", style="magenta")
-    transaction_table.add_column("时间", justify="left", style="magenta")
-    transaction_table.add_column("地点", justify="left", style="magenta")
-
-    # 添加行
-    transaction_table.add_row("最大单笔消费", f"{max_transaction['amount']:.2f}元", str(max_transaction['time']), max_transaction['place'])
-    transaction_table.add_row("最大食堂单笔消费", f"{max_pos_transaction['amount']:.2f}元", str(max_pos_transaction['time']), max_pos_transaction['place'])
-    transaction_table.add_row("最小单笔消费", f"{min_transaction['amount']:.2f}元", str(min_transaction['time']), min_transaction['place'])
-    transaction_table.add_row("最小食堂单笔消费", f"{min_pos_transaction['amount']:.2f}元", str(min_pos_transaction['time']), min_pos_transaction['place'])
-    transaction_table.add_row("年度第一笔消费", f"{earliest_transaction['amount']:.2f}元", str(earliest_transaction['time']), earliest_transaction['place'])
-    transaction_table.add_row("年度最后一笔消费", f"{latest_transaction['amount']:.2f}元", str(latest_transaction['time']), latest_transaction['place'])
-    transaction_table.add_row("每日最早消费", f"{earliest_time_transaction['amount']:.2f}元", str(earliest_time_transaction['time']), earliest_time_transaction['place'])
-    transaction_table.add_row("每日最晚消费", f"{latest_time_transaction['amount']:.2f}元", str(latest_time_transaction['time']), latest_time_transaction['place'])
-    transaction_table.add_row("每日最早食堂消费", f"{earliest_time_pos_transaction['amount']:.2f}元", str(earliest_time_pos_transaction['time']), earliest_time_pos_transaction['place'])
-    transaction_table.add_row("每日最晚食堂消费", f"{latest_time_pos_transaction['amount']:.2f}元", str(latest_time_pos_transaction['time']), latest_time_pos_transaction['place'])
-
-    console.print(transaction_table, justify="center")
-
-    return True
+class Summary:
+    """只携带聚合结果的轻量数据集，用于不需要原始记录的子图"""
+
+    def __init__(self, statistics):
+        self.statistics = statistics
+
+
+# 名称: (绘图函数, 图块尺寸（英寸）, 是否需要原始记录)
+PANELS = {
+    'heatmap': (plot_consumption_heatmap, (12, 4), False),  # 消费热力图
+    'trend': (plot_daily_trend, (12, 4), False),  # 每日消费趋势图
+    'scatter': (plot_daily_scatter, (4, 4), True),  # 每日消费散点图
+    'places': (plot_place_statistics, (8, 4), False),  # 消费地点统计
+    'types': (plot_type_pie_chart, (4, 4), False),  # 消费类型饼图
+    'monthly': (plot_monthly_pie_chart, (4, 4), False),  # 每月消费统计饼图
+    'slots': (plot_time_slot_pie_chart, (4, 4), False),  # 时段消费统计饼图
+}
+
+# 纵向图表布局，每行从左到右
+LAYOUT = [
+    ['heatmap'],
+    ['trend'],
+    ['scatter', 'places'],
+    ['types', 'monthly', 'slots'],
+]
+
+PREVIEW_DPI = 100
+
+# 趋势图最多 2 * TREND_BUCKETS 个点，一年的数据不受影响
+TREND_BUCKETS = 500
+
+
+def draw_panel(name, data, ax, title):
+    plot = PANELS[name][0]
+    if plot is plot_consumption_heatmap:
+        plot(data, ax, title)
+    else:
+        plot(data, ax)
+
+
+def render_figure(data, title):
+    """在同一个 Figure 上按 LAYOUT 绘制全部子图，用于 SVG 等矢量格式"""
+    width = sum(PANELS[name][1][0] for name in LAYOUT[0])
+    heights = [max(PANELS[name][1][1] for name in row) for row in LAYOUT]
+    fig = Figure(figsize=(width, sum(heights)), layout='constrained')
+    # 每行是一个独立排版的子图形，一行中的坐标轴标签不会挤占其他行
+    for row, subfig in zip(LAYOUT, fig.subfigures(len(LAYOUT), 1, height_ratios=heights)):
+        axes = subfig.subplots(1, len(row), width_ratios=[PANELS[name][1][0] for name in row], squeeze=False)[0]
+        for name, ax in zip(row, axes):
+            draw_panel(name, data, ax, title)
+    return fig
+
+
+def render_html(data, title):
+    """
+    生成内嵌 SVG 图表的单个 HTML 报告，不依赖外部文件
+    趋势图和散点图已抽稀，文件大小与交易笔数无关
+    """
+    stats = data.statistics
+    svg = io.StringIO()
+    render_figure(data, title).savefig(svg, format='svg')
+    svg = svg.getvalue()
+    summary = [
+        ('总消费', f"{stats.total:.2f}元"),
+        ('交易笔数', f"{stats.count}"),
+        ('平均每笔', f"{stats.mean:.2f}元"),
+        ('日均消费', f"{stats.daily_average:.2f}元"),
+    ]
+    rows = "\n".join(f"<tr><th>{name}</th><td>{value}</td></tr>" for name, value in summary)
+    return HTML_TEMPLATE.format(title=html.escape(title), rows=rows, figure=svg[svg.index('<svg'):])
+
+
+HTML_TEMPLATE = """<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>{title}</title>
+<style>
+body {{ margin: 0 auto; max-width: 1200px; padding: 16px; font-family: sans-serif; }}
+table {{ border-collapse: collapse; margin: 0 auto 16px; }}
+th, td {{ padding: 4px 16px; border-bottom: 1px solid #ddd; }}
+td {{ text-align: right; }}
+svg {{ width: 100%; height: auto; }}
+</style>
+</head>
+<body>
+<h1>{title}</h1>
+<table>
+{rows}
+</table>
+{figure}
+</body>
+</html>
+"""
+
+
+def render_panel(name, data, title, dpi, preview=False):
+    """
+    将一个子图绘制为 RGBA 图块，不经过 pyplot，可以在线程或子进程中调用
+    :return: (图块数组, 耗时)
+    """
+    start = time.perf_counter()
+    size = PANELS[name][1]
+
+    fig = Figure(figsize=size, dpi=dpi)
+    canvas = FigureCanvasAgg(fig)
+    draw_panel(name, data, fig.add_subplot(), title)
+
+    if preview:
+        fig.subplots_adjust(left=0.2, right=0.95, top=0.85, bottom=0.18)
+    else:
+        fig.tight_layout()
+    canvas.draw()
+    tile = np.asarray(canvas.buffer_rgba()).copy()
+    return tile, time.perf_counter() - start
@@ -0,0 +1,98 @@
+#
+# Created on Sun Oct 18 2026
+#
+# Copyright (c) 2026 Super Lee
+#
+
+"""
+无交互的编程接口，全部在内存中完成，不读写 data/ 目录，也不打印表格或等待输入
+
+    from tju_expense import api
+    fetcher = api.login(cookie)
+    data = api.load_dataset(api.fetch_records(fetcher, "2024-01-01", "2024-12-31"))
+    stats = api.get_statistics(data)      # 只包含内置类型的 dict
+    png = api.render(data, title="在天大的2024")  # PNG 图片的 bytes
+
+很大的数据文件可以分块读取，只保留聚合结果，得到的统计结果相同:
+
+    data = api.load_chunked("merged.csv", chunksize=100000)
+
+同一份数据先转换为 Dataset 再传入，统计结果只计算一次，统计和绘图共用
+"""
+
+import io
+import threading
+
+from tju_expense.chunked import load_chunked  # noqa: F401
+from tju_expense.dataset import load_dataset  # noqa: F401
+
+_font_lock = threading.Lock()
+_font_registered = False
+
+
+def login(cookie, **options):
+    """
+    登录校园卡网站，返回不显示进度条的 Fetcher
+    :param options: 传给 Fetcher 的参数，如 workers、rate、base_url
+    :raises ConnectionError: 登录失败
+    """
+    from tju_expense.fetch import Fetcher
+
+    fetcher = Fetcher(cookie, **options)
+    fetcher.progress = False
+    return fetcher
+
+
+def fetch_records(fetcher, start, end, include_top_up=False):
+    """
+    获取 [start, end] 的交易记录
+    :param fetcher: login 返回的 Fetcher，或者 Cookie（此时登录一次并在结束后关闭连接）
+    :return: 列类型与 load_records 相同的 DataFrame
+    """
+    if isinstance(fetcher, str):
+        fetcher = login(fetcher)
+        try:
+            return fetcher.get_batch(start, end, include_top_up).to_frame()
+        finally:
+            fetcher.close()
+    return fetcher.get_batch(start, end, include_top_up).to_frame()
+
+
+def fetch_year(fetcher, year, include_top_up=False):
+    """获取 year 年的全部交易记录，参数同 fetch_records"""
+    return fetch_records(fetcher, f"{year}-01-01", f"{year}-12-31", include_top_up)
+
+
+def get_statistics(data):
+    """
+    计算统计结果
+    :param data: Dataset（包括 load_chunked 的结果）、DataFrame 或数据文件路径（str 或 Path）
+    :return: Statistics.to_dict() 的结果，没有数据时返回 None
+    """
+    data = load_dataset(data)
+    if data.empty:
+        return None
+    return data.statistics.to_dict()
+
+
+def render(data, title="", format='png', dpi=150, preview=False, workers=None):
+    """
+    绘制年度总结图表，返回图片内容
+    :param format: png、svg 或 html（内嵌矢量图的单个网页）
+    :param workers: 并行绘图的进程数
+    :return: 图片的 bytes，没有数据时返回 None
+    :raises ValueError: 数据太少无法绘图
+    """
+    global _font_registered
+
+    from tju_expense import analyze
+
+    with _font_lock:
+        if not _font_registered:
+            analyze.register_font()
+            _font_registered = True
+
+    buffer = io.BytesIO()
+    if analyze.analyze(data, title=title, save_to=buffer, dpi=dpi, workers=workers, preview=preview, format=format) is None:
+        return None
+    return buffer.getvalue()
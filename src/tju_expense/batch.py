@@ -0,0 +1,143 @@
+#
+# Created on Sun Oct 18 2026
+#
+# Copyright (c) 2026 Super Lee
+#
+
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from pathlib import Path
+from rich.console import Console
+from rich.table import Table
+from tju_expense.cache import ReportCache
+from tju_expense.fetch import Fetcher
+from tju_expense.store import find_records, prepare_records
+
+
+console = Console()
+
+
+def read_batch_file(path):
+    """读取批量任务列表，每行是一个 Cookie 或一个 data/<学号> 目录，忽略空行和 # 开头的注释"""
+    entries = []
+    for line in Path(path).read_text(encoding='utf-8').splitlines():
+        line = line.strip()
+        if line and not line.startswith('#'):
+            entries.append(line)
+    return entries
+
+
+def fetch_entry(entry, data_dir, years, fmt, workers):
+    """
+    获取一个用户若干年份的数据
+    :return: [(用户目录, 年份, 数据文件或 None, 耗时, 错误信息)]
+    """
+    if Path(entry).is_dir():
+        # 已有数据目录，不需要登录
+        user_dir = Path(entry)
+        results = []
+        for year in years:
+            path = find_records(user_dir, year)
+            error = None if path else "没有本地数据"
+            results.append((user_dir, year, path, 0.0, error))
+        return results
+
+    try:
+        fetcher = Fetcher(entry, workers=workers)
+    except ConnectionError as e:
+        return [(None, year, None, 0.0, str(e)) for year in years]
+    fetcher.progress = False
+
+    user_dir = data_dir / fetcher.get_user_info()['stuid']
+    user_dir.mkdir(exist_ok=True)
+    results = []
+    try:
+        for year in years:
+            start = time.perf_counter()
+            try:
+                path = prepare_records(fetcher, user_dir, year, fmt)
+                results.append((user_dir, year, path, time.perf_counter() - start, None))
+            except Exception as e:
+                results.append((user_dir, year, None, time.perf_counter() - start, str(e)))
+    finally:
+        fetcher.close()
+    return results
+
+
+def render_report(user_dir, year, path, dpi=300, preview=False, report_format='png'):
+    """在子进程中生成统计表格和图表，返回耗时"""
+    import matplotlib
+    matplotlib.use('Agg')
+    from tju_expense.analyze import analyze, print_statistics, register_font
+    from tju_expense.dataset import Dataset
+
+    start = time.perf_counter()
+    register_font()
+    data = Dataset.load(path)
+    if data.empty:
+        return time.perf_counter() - start
+    cache = ReportCache(user_dir / year)
+    if not cache.load_statistics(data):
+        cache.save_statistics(data)
+    with open(user_dir / f"{year}.txt", 'w', encoding='utf-8') as f:
+        print_statistics(data, console=Console(file=f, width=100))
+
+    image = user_dir / f"{year}.{report_format}"
+    key = cache.render_key(data, title=f"在天大的{year}", dpi=dpi, preview=preview, format=report_format)
+    if not cache.is_rendered(key, image):
+        try:
+            timings = analyze(data, title=f"在天大的{year}", save_to=image, dpi=dpi, preview=preview,
+                              format=report_format)
+            cache.save_render(key, image, timings)
+        except ValueError:
+            # 数据太少时无法绘制饼图，表格仍然保留
+            pass
+    return time.perf_counter() - start
+
+
+def run_batch(entries, years, data_dir, fmt='csv', workers=4, fetch_workers=4, processes=None, dpi=300, preview=False,
+              report_format='png'):
+    """
+    批量生成多个用户、多个年份的报告：获取数据在线程池中并发进行，
+    每份数据就绪后立即提交到进程池绘图，全部完成后打印耗时和失败汇总
+    :param entries: Cookie 或 data/<学号> 目录列表
+    :param years: 年份列表
+    :return: 失败的任务数
+    """
+    rows = []
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=fetch_workers) as fetch_pool, \
+            ProcessPoolExecutor(max_workers=processes) as render_pool:
+        fetches = [fetch_pool.submit(fetch_entry, entry, data_dir, years, fmt, workers) for entry in entries]
+        renders = {}
+        for future in as_completed(fetches):
+            for user_dir, year, path, fetch_time, error in future.result():
+                row = {'user': user_dir.name if user_dir else '-', 'year': year, 'fetch': fetch_time, 'render': None, 'error': error}
+                rows.append(row)
+                if path is not None:
+                    renders[render_pool.submit(render_report, user_dir, year, path, dpi, preview,
+                                               report_format)] = row
+
+        for future in as_completed(renders):
+            row = renders[future]
+            try:
+                row['render'] = future.result()
+            except Exception as e:
+                row['error'] = str(e)
+
+    table = Table(title=f"批量报告 (总耗时 {time.perf_counter() - started:.1f}s)")
+    table.add_column("学号", justify="left", style="cyan", no_wrap=True)
+    table.add_column("年份", justify="left", style="cyan")
+    table.add_column("获取", justify="right", style="magenta")
+    table.add_column("绘图", justify="right", style="magenta")
+    table.add_column("状态", justify="left")
+
+    failed = 0
+    for row in sorted(rows, key=lambda row: (row['user'], row['year'])):
+        render = f"{row['render']:.1f}s" if row['render'] is not None else "-"
+        status = "[green]完成" if row['error'] is None else f"[red]{row['error']}"
+        failed += row['error'] is not None
+        table.add_row(row['user'], row['year'], f"{row['fetch']:.1f}s", render, status)
+
+    console.print(table, justify="center")
+    return failed
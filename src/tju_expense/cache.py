@@ -0,0 +1,138 @@
+#
+# Created on Sun Oct 18 2026
+#
+# Copyright (c) 2026 Super Lee
+#
+
+import gzip
+import hashlib
+import json
+import os
+import pickle
+import threading
+import time
+
+from datetime import date
+from importlib.metadata import PackageNotFoundError, version
+
+
+def package_version():
+    try:
+        return version('tju-expense')
+    except PackageNotFoundError:
+        return 'dev'
+
+
+def make_key(**params):
+    """将参数序列化后取哈希，作为缓存键"""
+    params['version'] = package_version()
+    text = json.dumps(params, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class ReportCache:
+    """
+    按数据内容缓存统计结果和图表，数据和参数都没有变化时跳过重新计算
+    :param prefix: 缓存文件的路径前缀，如 data/<学号>/<年份>
+    """
+
+    def __init__(self, prefix):
+        self.stats_file = prefix.with_name(prefix.name + '.stats.pkl')
+        # 统计结果的缓存键单独保存，不一致时无需反序列化 pickle
+        self.stats_key_file = prefix.with_name(prefix.name + '.stats.json')
+        self.render_file = prefix.with_name(prefix.name + '.render.json')
+
+    def load_statistics(self, data):
+        """命中缓存时直接设置 data.statistics，返回是否命中"""
+        try:
+            manifest = json.loads(self.stats_key_file.read_text(encoding='utf-8'))
+        except (FileNotFoundError, ValueError):
+            return False
+        if not isinstance(manifest, dict) or manifest.get('key') != make_key(data=data.digest):
+            return False
+        from tju_expense.stats import Statistics
+
+        try:
+            with open(self.stats_file, 'rb') as f:
+                statistics = pickle.load(f)
+        except Exception:
+            # 文件损坏、写入不完整，或者升级 pandas 等依赖后无法反序列化，都按未命中处理
+            return False
+        if not isinstance(statistics, Statistics):
+            return False
+        data.statistics = statistics
+        return True
+
+    def save_statistics(self, data):
+        # 先删除旧的缓存键，写完统计结果后再写入新的，中途中断时缓存键不会指向不完整或不对应的文件
+        self.stats_key_file.unlink(missing_ok=True)
+        with open(self.stats_file, 'wb') as f:
+            pickle.dump(data.statistics, f)
+        self.stats_key_file.write_text(json.dumps({'key': make_key(data=data.digest)}), encoding='utf-8')
+
+    def render_key(self, data, **params):
+        """数据内容和绘图参数决定的图表缓存键，子图的组成随版本号变化"""
+        return make_key(data=data.digest, **params)
+
+    def is_rendered(self, key, image):
+        """图表文件存在且由相同的数据和参数生成"""
+        if not image.exists():
+            return False
+        try:
+            manifest = json.loads(self.render_file.read_text(encoding='utf-8'))
+        except (FileNotFoundError, ValueError):
+            return False
+        return manifest.get('key') == key and manifest.get('image') == image.name
+
+    def save_render(self, key, image, timings=None):
+        manifest = {'key': key, 'image': image.name, 'timings': timings or {}}
+        self.render_file.write_text(json.dumps(manifest, ensure_ascii=False), encoding='utf-8')
+
+
+class PageCache:
+    """
+    gzip 压缩保存 consume/query 的原始页面，按查询参数和页码索引，修改解析规则后无需重新请求服务器
+    页面的获取时间写在 gzip 头中，在查询区间结束的月份之后获取的页面不会再变化，永久有效；
+    查询区间尚未结束时获取的页面在 ttl 秒后过期
+    :param directory: 缓存目录，如 data/<学号>/pages
+    :param ttl: 查询区间尚未结束时获取的页面的有效期（秒）
+    """
+
+    def __init__(self, directory, ttl=600):
+        self.dir = directory
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+
+    def path(self, start, end, page, include_top_up=False):
+        # 原始页面与版本无关，键中不包含版本号
+        params = {'start': start, 'end': end, 'page': page, 'include_top_up': include_top_up}
+        key = hashlib.sha256(json.dumps(params, sort_keys=True).encode('utf-8')).hexdigest()
+        return self.dir / f"{key}.html.gz"
+
+    def is_immutable(self, end, fetched):
+        """获取时间 fetched（时间戳）在 end 所在月份之后时，页面不会再变化"""
+        return str(end)[:7] < date.fromtimestamp(fetched).strftime('%Y-%m')
+
+    def get(self, start, end, page, include_top_up=False):
+        """返回缓存的页面，不存在或已过期时返回 None"""
+        path = self.path(start, end, page, include_top_up)
+        try:
+            with gzip.GzipFile(path, 'rb') as f:
+                html = f.read().decode('utf-8')
+                fetched = f.mtime
+        except (OSError, EOFError, UnicodeDecodeError):
+            return None
+        if not fetched or not self.is_immutable(end, fetched) and time.time() - fetched > self.ttl:
+            return None
+        return html
+
+    def put(self, html, start, end, page, include_top_up=False):
+        path = self.path(start, end, page, include_top_up)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        # gzip 头中的时间戳记录页面的获取时间，不受文件复制或修改时间变化的影响
+        with gzip.GzipFile(tmp, 'wb', mtime=int(time.time())) as f:
+            f.write(html.encode('utf-8'))
+        tmp.replace(path)
+
+    def discard(self, start, end, page, include_top_up=False):
+        self.path(start, end, page, include_top_up).unlink(missing_ok=True)
@@ -0,0 +1,63 @@
+#
+# Created on Sun Oct 18 2026
+#
+# Copyright (c) 2026 Super Lee
+#
+
+"""
+分块分析: 按固定行数流式读取数据文件，每块只计算可合并的预聚合结果（Rollups，含抽稀后的散点），
+随后丢弃原始记录，峰值内存只与块大小有关，统计表格与一次性读取时相同
+"""
+
+import hashlib
+import pandas as pd
+
+from functools import cached_property
+from tju_expense.constants import FIELDS
+from tju_expense.dataset import Dataset
+from tju_expense.rollup import Rollups
+from tju_expense.store import iter_record_chunks
+from tju_expense.timings import timings
+
+
+class ChunkedDataset(Dataset):
+    """
+    只保存预聚合结果、不保存原始记录（df 为 None）的 Dataset
+    可以直接传给 print_statistics、analyze 和 ReportCache
+    :param rollups: 全部记录的 Rollups，没有记录时为 None
+    :param digest: 数据内容的哈希，用作统计和图表的缓存键
+    """
+
+    def __init__(self, rollups, digest):
+        self.df = None
+        self.rollups = rollups
+        self.rows = 0 if rollups is None else int(rollups.daily['rows'].sum())
+        self.digest = digest
+        self.scatter = None if rollups is None else rollups.scatter
+
+    @property
+    def empty(self):
+        return self.rows == 0
+
+    @cached_property
+    def statistics(self):
+        return self.rollups.statistics()
+
+
+def load_chunked(path, chunksize=100000):
+    """
+    每次读取 path 中的 chunksize 行，逐块合并预聚合结果，同一时刻内存中只有一块原始记录
+    极值相同时取时间最晚的记录，与记录在文件中的顺序无关，与一次性读取时相同
+    :return: ChunkedDataset，digest 与一次性读取同一文件时相同
+    """
+    rollups = None
+    digest = hashlib.sha256()
+    for chunk in iter_record_chunks(path, chunksize):
+        if chunk.empty:
+            continue
+        timings.count('chunks')
+        # 逐行哈希与 Dataset.digest 相同，按块依次写入即得到相同的结果
+        digest.update(pd.util.hash_pandas_object(chunk[FIELDS], index=False).values.tobytes())
+        rollup = Rollups.from_frame(chunk)
+        rollups = rollup if rollups is None else Rollups.merge([rollups, rollup])
+    return ChunkedDataset(rollups, digest.hexdigest())
@@ -0,0 +1,204 @@
+#
+# Created on Sun Oct 18 2026
+#
+# Copyright (c) 2026 Super Lee
+#
+
+import csv
+import numpy as np
+import pandas as pd
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from rich.console import Console
+from rich.table import Table
+from tju_expense.constants import FORMATS
+from tju_expense.dataset import UTILITY_PATTERN
+from tju_expense.store import find_records, iter_record_chunks
+
+
+console = Console()
+
+# 单笔金额直方图: 以 0.1 元为一格，覆盖 [-100, 1000) 元，超出范围的计入两端
+HIST_STEP = 10  # 分
+HIST_MIN = -100 * 100
+HIST_BINS = (1000 * 100 - HIST_MIN) // HIST_STEP
+
+PERCENTILES = [25, 50, 75, 90]
+
+
+def find_sources(user_dir, year):
+    """用户目录下 year 年的数据文件: 年度数据文件，没有时使用历史数据中当年的月份分区"""
+    path = find_records(user_dir, year)
+    if path is not None:
+        return [path]
+    history = user_dir / 'history'
+    return sorted(
+        path for suffix in FORMATS.values()
+        for path in history.glob(f"{year}-*{suffix}")
+    )
+
+
+def amount_histogram(amount):
+    cents = np.round(amount.dropna().to_numpy() * 100).astype(np.int64)
+    index = np.clip((cents - HIST_MIN) // HIST_STEP, 0, HIST_BINS - 1)
+    return np.bincount(index, minlength=HIST_BINS)
+
+
+def histogram_percentile(hist, q):
+    """由直方图估计第 q 百分位数，误差不超过一格"""
+    total = hist.sum()
+    if total == 0:
+        return float('nan')
+    index = int(np.searchsorted(np.cumsum(hist), total * q / 100))
+    return (HIST_MIN + index * HIST_STEP) / 100
+
+
+def scan_user(user_dir, year, chunksize=100000):
+    """
+    在子进程中分块扫描一个用户的数据，只返回聚合结果
+    :return: (学号, 消费总额, 笔数, 地点×小时的 count/sum, 单笔金额直方图)，没有数据时返回 None
+    """
+    sources = find_sources(user_dir, year)
+    if not sources:
+        return None
+    total, count = 0.0, 0
+    place_hour = []
+    hist = np.zeros(HIST_BINS, dtype=np.int64)
+    for path in sources:
+        for chunk in iter_record_chunks(path, chunksize):
+            total += chunk['amount'].sum()
+            count += len(chunk)
+            hist += amount_histogram(chunk['amount'])
+            pos = chunk[~chunk['type'].str.contains(UTILITY_PATTERN, na=False)]
+            place_hour.append(
+                pos.groupby([pos['place'].astype(str), pos['time'].dt.hour.rename('hour')])['amount'].agg(['count', 'sum'])
+            )
+    if count == 0:
+        return None
+    place_hour = pd.concat(place_hour).groupby(level=[0, 1]).sum() if place_hour else None
+    return user_dir.name, total, count, place_hour, hist
+
+
+def read_groups(path):
+    """读取 学号,分组 两列的 CSV（如宿舍或学院），没有表头"""
+    with open(path, newline='', encoding='utf-8') as f:
+        return {row[0].strip(): row[1].strip() for row in csv.reader(f) if len(row) >= 2}
+
+
+class CohortSummary:
+    """
+    按分组累加的聚合结果，每个用户的扫描结果到达后立即合并，不保留原始记录
+    每个用户只保留消费总额，用于计算人均消费的百分位数
+    """
+
+    def __init__(self):
+        self.users = {}  # 分组 -> [每个用户的消费总额]
+        self.counts = {}  # 分组 -> 交易笔数
+        self.hists = {}  # 分组 -> 单笔金额直方图
+        self.place_hour = None  # (分组, 地点, 小时) -> count/sum
+
+    def add(self, group, result):
+        _, total, count, place_hour, hist = result
+        self.users.setdefault(group, []).append(total)
+        self.counts[group] = self.counts.get(group, 0) + count
+        if group in self.hists:
+            self.hists[group] += hist
+        else:
+            self.hists[group] = hist.copy()
+        if place_hour is not None and not place_hour.empty:
+            place_hour = pd.concat({group: place_hour}, names=['group'])
+            tables = [place_hour] if self.place_hour is None else [self.place_hour, place_hour]
+            self.place_hour = pd.concat(tables).groupby(level=[0, 1, 2]).sum()
+
+    def distribution(self):
+        """每个分组的人数、笔数、人均消费和百分位数"""
+        rows = []
+        for group in sorted(self.users):
+            totals = np.array(self.users[group])
+            row = {
+                'group': group,
+                'users': len(totals),
+                'count': self.counts[group],
+                'mean': totals.mean(),
+            }
+            for q in PERCENTILES:
+                row[f'p{q}'] = np.percentile(totals, q)
+            for q in (50, 90):
+                row[f'amount_p{q}'] = histogram_percentile(self.hists[group], q)
+            rows.append(row)
+        return pd.DataFrame(rows).set_index('group') if rows else pd.DataFrame()
+
+    def busiest(self, top=10):
+        """每个分组消费笔数最多的 (地点, 小时)"""
+        if self.place_hour is None:
+            return pd.DataFrame(columns=['count', 'sum'])
+        table = self.place_hour.sort_values('count', ascending=False)
+        return table.groupby(level=0, group_keys=False).head(top).sort_index(level=0, sort_remaining=False)
+
+
+def run_cohort(data_dir, year, processes=None, groups=None, chunksize=100000):
+    """
+    并行扫描 data_dir 下所有用户目录中 year 年的数据
+    :param groups: 学号 -> 分组，未列出的用户归入“其他”；为空时所有用户为同一组
+    :return: CohortSummary
+    """
+    user_dirs = sorted(path for path in Path(data_dir).iterdir() if path.is_dir())
+    summary = CohortSummary()
+    skipped = 0
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        futures = [pool.submit(scan_user, user_dir, year, chunksize) for user_dir in user_dirs]
+        with console.status(f"正在扫描 {len(user_dirs)} 个用户的 {year} 年数据...") as status:
+            for done, future in enumerate(as_completed(futures), 1):
+                status.update(f"正在扫描 {len(user_dirs)} 个用户的 {year} 年数据... {done}/{len(user_dirs)}")
+                try:
+                    result = future.result()
+                except Exception as e:
+                    console.log(f"[red]扫描失败: {e}")
+                    result = None
+                if result is None:
+                    skipped += 1
+                    continue
+                group = '全部' if groups is None else groups.get(result[0], '其他')
+                summary.add(group, result)
+    console.log(f"共扫描 {len(user_dirs)} 个用户, 其中 {skipped} 个没有 {year} 年的数据")
+    return summary
+
+
+def print_cohort(summary, top=10, console=console):
+    """打印各分组的消费分布和最繁忙的食堂时段"""
+    distribution = summary.distribution()
+    if distribution.empty:
+        console.log("没有数据")
+        return None
+
+    table = Table(title="消费分布 (元)")
+    table.add_column("分组", justify="left", style="cyan", no_wrap=True)
+    table.add_column("人数", justify="right", style="magenta")
+    table.add_column("笔数", justify="right", style="magenta")
+    table.add_column("人均", justify="right", style="magenta")
+    for q in PERCENTILES:
+        table.add_column(f"P{q}", justify="right", style="magenta")
+    table.add_column("单笔中位数", justify="right", style="magenta")
+    table.add_column("单笔 P90", justify="right", style="magenta")
+
+    for group, row in distribution.iterrows():
+        table.add_row(
+            group, str(int(row['users'])), str(int(row['count'])), f"{row['mean']:.2f}",
+            *(f"{row[f'p{q}']:.2f}" for q in PERCENTILES),
+            f"{row['amount_p50']:.2f}", f"{row['amount_p90']:.2f}",
+        )
+    console.print(table, justify="center")
+
+    busiest = summary.busiest(top)
+    busiest_table = Table(title="最繁忙的食堂时段")
+    busiest_table.add_column("分组", justify="left", style="cyan", no_wrap=True)
+    busiest_table.add_column("地点", justify="left", style="cyan")
+    busiest_table.add_column("时段", justify="left", style="cyan")
+    busiest_table.add_column("笔数", justify="right", style="magenta")
+    busiest_table.add_column("总金额", justify="right", style="magenta")
+    for (group, place, hour), row in busiest.iterrows():
+        busiest_table.add_row(group, place, f"{hour:02d}:00-{hour + 1:02d}:00", str(int(row['count'])), f"{row['sum']:.2f}元")
+    console.print(busiest_table, justify="center")
+
+    return True
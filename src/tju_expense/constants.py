@@ -0,0 +1,39 @@
+#
+# Created on Sun Oct 18 2026
+#
+# Copyright (c) 2026 Super Lee
+#
+
+# 只包含常量，命令行启动时导入它不会加载 requests/pandas 等较重的依赖
+
+BASE_URL = "http://59.67.37.10:8180"
+
+
+def make_urls(base_url=BASE_URL):
+    """校园卡网站各页面的地址，base_url 可以指向本地的模拟服务器"""
+    return {
+        "repo": "https://github.com/superpung/tju-expense",
+        "finance": "https://finance.tju.edu.cn/",
+        "login": f"{base_url}/epay/person/index",
+        "user_info": f"{base_url}/epay/personaccount/index",
+        "records": f"{base_url}/epay/consume/query",
+    }
+
+
+URLS = make_urls()
+
+# consume/query 每页的交易记录数
+PAGE_SIZE = 10
+
+# 交易记录的字段
+FIELDS = ["time", "id", "type", "amount", "place"]
+
+# 数据文件格式及扩展名
+FORMATS = {
+    'csv': '.csv',
+    'parquet': '.parquet',
+    'feather': '.feather',
+}
+
+# 图表报告的输出格式，同时作为扩展名
+REPORT_FORMATS = ['png', 'svg', 'html']
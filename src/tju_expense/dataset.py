@@ -0,0 +1,113 @@
+#
+# Created on Sun Oct 18 2026
+#
+# Copyright (c) 2026 Super Lee
+#
+
+import hashlib
+import numpy as np
+import pandas as pd
+
+from functools import cached_property
+from tju_expense.constants import FIELDS
+from tju_expense.store import load_records
+
+# 类型中包含这些字的是水电费，不计入食堂消费
+UTILITY_PATTERN = '水|电'
+
+TIME_SLOTS = {
+    '早餐': (5, 11),  # 5点到11点
+    '午餐': (11, 17),  # 11点到17点
+    '晚餐': (17, 24)  # 17点到24点
+}
+# 时段首尾相接，用区间端点一次性分箱
+SLOT_BINS = [start for start, _ in TIME_SLOTS.values()] + [list(TIME_SLOTS.values())[-1][1]]
+
+# 散点图超过 SCATTER_MAX_POINTS 个点时按网格抽稀，网格为 15 分钟 × 100 个金额区间
+SCATTER_MAX_POINTS = 5000
+SCATTER_GRID = (24 * 4, 100)
+
+
+def scatter_points(df):
+    """散点图的点: 消费时刻（0-24 的小时数）和金额"""
+    time = df['time'].dt
+    return time.hour + time.minute / 60, df['amount']
+
+
+def thin_scatter(x, y, max_points=SCATTER_MAX_POINTS, grid=SCATTER_GRID):
+    """
+    散点超过 max_points 个时，把绘图区域划分为 grid（列数, 行数）个格子，每个格子只保留一个点
+    有点的格子和离群点都会保留，分布的形状不变，点数不超过格子数
+    """
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    valid = ~(np.isnan(x) | np.isnan(y))
+    x, y = x[valid], y[valid]
+    if len(x) <= max_points:
+        return x, y
+    columns, rows = grid
+    column = np.clip((x / 24 * columns).astype(int), 0, columns - 1)
+    low, high = y.min(), y.max()
+    row = np.clip(((y - low) / ((high - low) or 1) * rows).astype(int), 0, rows - 1)
+    _, first = np.unique(row * columns + column, return_index=True)
+    return x[first], y[first]
+
+
+class Dataset:
+    """交易记录及统计和绘图共用的派生列，只加载和计算一次"""
+
+    def __init__(self, df):
+        # assign 返回新的 DataFrame，不修改调用方传入的对象；原有列在写时复制下共享，不额外占用内存
+        time = df['time'].dt
+        date = time.normalize()
+        hour = time.hour
+        df = df.assign(
+            date=date,
+            weekday=time.weekday,
+            week=time.isocalendar().week,
+            hour=hour,
+            month=time.to_period('M'),
+            seconds=(df['time'] - date) // pd.Timedelta(seconds=1),
+            slot=pd.cut(hour, bins=SLOT_BINS, labels=list(TIME_SLOTS), right=False),
+        )
+
+        self.df = df
+        self.is_utility = df['type'].str.contains(UTILITY_PATTERN, na=False)
+
+    @classmethod
+    def load(cls, path):
+        return cls(load_records(path))
+
+    @property
+    def empty(self):
+        return self.df.empty
+
+    @cached_property
+    def pos(self):
+        """食堂消费（排除水电费）"""
+        return self.df[~self.is_utility]
+
+    @cached_property
+    def digest(self):
+        """交易记录内容的哈希，用于判断数据是否变化"""
+        hashes = pd.util.hash_pandas_object(self.df[FIELDS], index=False)
+        return hashlib.sha256(hashes.values.tobytes()).hexdigest()
+
+    @cached_property
+    def scatter(self):
+        """散点图使用的 (时刻, 金额) 数组，点数过多时已抽稀"""
+        return thin_scatter(*scatter_points(self.df))
+
+    @cached_property
+    def statistics(self):
+        """统计表格和图表共用的聚合结果"""
+        from tju_expense.stats import compute_statistics
+        return compute_statistics(self)
+
+
+def load_dataset(data):
+    """接受 Dataset、DataFrame 或数据文件路径（str 或 Path），返回 Dataset"""
+    if isinstance(data, Dataset):
+        return data
+    if isinstance(data, pd.DataFrame):
+        return Dataset(data)
+    return Dataset.load(data)
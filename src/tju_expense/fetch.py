@@ -5,48 +5,166 @@
 #
 
 import re
+import time
 import requests
 
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
 from bs4 import BeautifulSoup
-from rich.progress import track
+from requests.adapters import HTTPAdapter
+from rich.progress import Progress
+from tju_expense.constants import BASE_URL, FIELDS, PAGE_SIZE, URLS, make_urls  # noqa: F401
+from tju_expense.parse import ID, InvalidPage, parse_records, parse_rows
+from tju_expense.records import RecordBatch
+from tju_expense.throttle import Throttle
+from tju_expense.timings import timings
+
+
+# 服务器出错或要求降速时重试的状态码
+RETRY_STATUS = (429, 500, 502, 503, 504)
+# Retry-After 要求等待的最长秒数
+MAX_RETRY_AFTER = 60
+
+
+def retry_after(response):
+    """429/503 响应中 Retry-After 要求等待的秒数，没有或无法解析时返回 None"""
+    if response is None or response.status_code not in (429, 503):
+        return None
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds()
+        except (TypeError, ValueError):
+            return None
+    return min(MAX_RETRY_AFTER, max(0.0, seconds))
+
+
+def month_shards(start, end):
+    """
+    将 [start, end] 切分为按月的子区间，从新到旧排列，与查询结果的顺序一致
+    :return: [(开始日期, 结束日期)]，格式为2022-03-30
+    """
+    first, last = date.fromisoformat(str(start)[:10]), date.fromisoformat(str(end)[:10])
+    shards = []
+    cursor = first
+    while cursor <= last:
+        next_month = (cursor.replace(day=1) + timedelta(days=32)).replace(day=1)
+        shard_end = min(last, next_month - timedelta(days=1))
+        shards.append((cursor.isoformat(), shard_end.isoformat()))
+        cursor = next_month
+    return shards[::-1]
+
+
+def is_new(record_id, seen):
+    """按交易号去重，没有交易号的记录全部保留"""
+    if record_id is None:
+        return True
+    if record_id in seen:
+        return False
+    seen.add(record_id)
+    return True
 
-BASE_URL = "http://59.67.37.10:8180"
-URLS = {
-    "repo": "https://github.com/superpung/tju-expense",
-    "finance": "https://finance.tju.edu.cn/",
-    "login": f"{BASE_URL}/epay/person/index",
-    "user_info": f"{BASE_URL}/epay/personaccount/index",
-    "records": f"{BASE_URL}/epay/consume/query",
-}
 
 class Fetcher:
-    def __init__(self, cookie: str):
+    def __init__(self, cookie: str, workers: int = 4, pool_size=None, retries=3, backoff=0.5, timeout=(5, 30),
+                 rate=None, burst=None, base_url=None, page_cache=None):
+        """
+        :param cookie: 校园卡网站的 JSESSIONID
+        :param workers: 同时请求的最大页数，服务器变慢或出错时自动降低
+        :param pool_size: 连接池大小，默认与 workers 相同
+        :param retries: 连接失败、服务器出错或页面不完整时的重试次数
+        :param backoff: 重试间隔的退避系数（秒）
+        :param timeout: 请求超时时间，(连接, 读取) 秒
+        :param rate: 每秒最多请求的页数，默认不限速
+        :param burst: 允许连续请求的页数，默认与 rate 相同
+        :param base_url: 校园卡网站地址，默认为 BASE_URL，测试时可以指向模拟服务器
+        :param page_cache: 可选的 PageCache，保存原始页面，命中时不再请求服务器
+        """
         if not cookie.startswith("JSESSIONID"):
             self.cookie = f"JSESSIONID={cookie}"
         else:
             self.cookie = cookie
         self.csrf = None
+        self.urls = make_urls(base_url) if base_url else URLS
+        self.workers = max(1, workers)
+        self.progress = True  # 是否显示进度条，多个 Fetcher 并发时需要关闭
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.throttle = Throttle(self.workers, rate, burst)
+        self.page_cache = page_cache
+        self.session = self.create_session(pool_size or self.workers)
         self.user_info = self.fetch_user_info()
 
+    def create_session(self, pool_size):
+        """
+        创建所有请求共用的连接池会话
+        urllib3 不做任何重试，重试全部由 request_page 完成，每次重试都经过限速和自适应并发并计入统计
+        """
+        self.adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        session = requests.Session()
+        session.mount("http://", self.adapter)
+        session.mount("https://", self.adapter)
+        session.headers["Cookie"] = self.cookie
+        return session
+
+    def get_connection_stats(self):
+        """统计连接池中新建和复用的连接数"""
+        opened = requests_sent = 0
+        pools = self.adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools[key]
+            opened += pool.num_connections
+            requests_sent += pool.num_requests
+        return {
+            "opened": opened,
+            "reused": max(0, requests_sent - opened),
+            "requests": requests_sent,
+        }
+
+    def get_throttle_stats(self):
+        """统计页面请求、重试和限速等待的情况"""
+        return self.throttle.get_stats()
+
+    def close(self):
+        self.session.close()
+
     def get_user_info(self):
         return self.user_info
 
     def fetch_user_info(self):
-        url = URLS["user_info"]
-        headers = {
-            'Cookie': self.cookie
-        }
-        try:
-            response = requests.get(url, headers=headers)
-        except requests.exceptions.InvalidSchema as _:
-            raise ConnectionError(f"[登录失败] 请确认正在使用校园网环境, 关闭终端代理, 或重启终端")
+        url = self.urls["user_info"]
+        error = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                time.sleep(self.retry_delay(attempt, error))
+            try:
+                response = self.session.get(url, timeout=self.timeout)
+                if response.status_code in RETRY_STATUS:
+                    response.raise_for_status()
+                break
+            except (requests.exceptions.InvalidSchema, requests.exceptions.ConnectionError, requests.exceptions.Timeout) as _:
+                raise ConnectionError(f"[登录失败] 请确认正在使用校园网环境, 关闭终端代理, 或重启终端")
+            except requests.exceptions.HTTPError as e:
+                # 服务器出错或要求降速，退避后重试
+                error = e
+            except requests.exceptions.RequestException as e:
+                raise ConnectionError(f"[登录失败] {e}")
+        else:
+            raise ConnectionError(f"[登录失败] 服务器暂时无法访问, 请稍后重试: {error}")
         soup = BeautifulSoup(response.text, 'html.parser')
 
         meta_match = re.search(r'<meta name="_csrf" content="([^"]+)"', response.text)
         if meta_match:
             self.csrf = meta_match.group(1)
         else:
-            raise ConnectionError(f"[登录失败] 请访问 {URLS['login']} 重新获取 Cookie")
+            raise ConnectionError(f"[登录失败] 请访问 {self.urls['login']} 重新获取 Cookie")
 
         res = {}
 
@@ -67,29 +185,187 @@ class Fetcher:
 
         return res
 
-    def get_records(self, start, end):
+    def get_records(self, start, end, include_top_up=False, workers=None):
         """
-        获取交易记录
+        获取交易记录，跨月的区间按月分片并发获取，按交易号去重
         :param start: 开始日期，格式为2022-03-30
         :param end: 结束日期，格式为2022-03-30
+        :param include_top_up: 是否包含充值记录
+        :param workers: 同时请求的最大页数，默认使用初始化时的设置
         :return: 指定日期内的交易记录
         """
-        records = []
-        res1, cnt = self.get_record(start, end, 1)
-        records.extend(res1)
+        return list(self.iter_records(start, end, include_top_up, workers))
+
+    def get_batch(self, start, end, include_top_up=False, workers=None):
+        """
+        获取交易记录并按列保存，参数同 get_records
+        :return: RecordBatch，可以直接转换为 DataFrame
+        """
+        batch = RecordBatch()
+        seen = set()
+        for _, _, rows in self.iter_shards(start, end, include_top_up, workers, rows=True):
+            batch.extend(row for row in rows if is_new(row[ID], seen))
+        return batch
+
+    def iter_records(self, start, end, include_top_up=False, workers=None):
+        """逐条产出交易记录，参数同 get_records"""
+        seen = set()
+        for _, _, records in self.iter_shards(start, end, include_top_up, workers):
+            yield from (record for record in records if is_new(record.get('id'), seen))
+
+    def iter_shards(self, start, end, include_top_up=False, workers=None, rows=False, resume=None):
+        """
+        将 [start, end] 按月切分，每个分片单独分页查询，所有分片的页面共用一个线程池并发获取
+        分页只按偏移量计算，中途有新交易时后面的页面都会错位，乱序获取可能漏掉记录；
+        按月切分后只有包含今天的分片会变化，这个分片在一个线程中逐页顺序获取，错位时只会重复，由调用方去重
+        :param rows: 为 True 时产出 parse_rows 的元组而不是 dict
+        :param resume: 可选回调，参数为 (分片, 总页数)，返回该分片已完成、需要跳过的页码集合；
+                       包含今天的分片每次都完整获取，不调用此回调
+        :return: 生成器，按时间从新到旧、页码从小到大产出 ((分片开始, 分片结束), 页码, 该页交易记录)
+        """
+        shards = month_shards(start, end)
+        get_page = self.get_page if rows else self.get_record
+        workers = workers or self.workers
+        today = date.today().isoformat()
 
-        for i in track(range(2, cnt + 1)):
-            res2, cnt = self.get_record(start, end, i)
-            records.extend(res2)
+        def get_live_pages(shard, records, page_cnt):
+            pages = [(1, records)]
+            page = 1
+            while page < page_cnt:
+                page += 1
+                records, cnt = get_page(*shard, page, include_top_up)
+                # 末尾的记录可能被新交易挤到新增的页面上
+                page_cnt = max(page_cnt, cnt)
+                pages.append((page, records))
+            return pages
 
-        return records
+        def ordered(progress=None):
+            # 各分片的第一页返回之前总页数未知，进度条不确定
+            task = progress.add_task("Fetching pages...", total=None) if progress is not None else None
+            total = 0
+
+            def update(pages=0, advance=0):
+                """进度条的总数增加 pages 页，完成数增加 advance 页"""
+                nonlocal total
+                total += pages
+                if progress is not None:
+                    progress.update(task, total=total, advance=advance)
+
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                pending = deque()
+
+                def resolve():
+                    shard, page, future = pending.popleft()
+                    if page is None:
+                        pages = future.result()
+                        # 包含今天的分片获取期间可能新增页面，计入总数
+                        update(pages=len(pages) - live_pages[shard])
+                        for page, records in pages:
+                            update(advance=1)
+                            yield shard, page, records
+                    else:
+                        records = future.result()[0]
+                        update(advance=1)
+                        yield shard, page, records
+
+                # 先获取各分片的第一页得到总页数，确定进度条的总数后再按顺序提交其余页面，缓冲区有空位时才继续提交
+                firsts = [executor.submit(get_page, shard_start, shard_end, 1, include_top_up)
+                          for shard_start, shard_end in shards]
+                plans, live_pages = [], {}
+                for shard, first in zip(shards, firsts):
+                    records, page_cnt = first.result()
+                    if shard[1] >= today:
+                        live_pages[shard] = page_cnt
+                        plans.append((shard, first, records, page_cnt, None))
+                    else:
+                        done = resume(shard, page_cnt) if resume else set()
+                        plans.append((shard, first, records, page_cnt, done))
+                update(pages=sum(page_cnt - len(done or ()) for _, _, _, page_cnt, done in plans))
+
+                for shard, first, records, page_cnt, done in plans:
+                    if done is None:
+                        pending.append((shard, None, executor.submit(get_live_pages, shard, records, page_cnt)))
+                        continue
+                    if 1 not in done:
+                        pending.append((shard, 1, first))
+                    for page in range(2, page_cnt + 1):
+                        if page in done:
+                            continue
+                        pending.append((shard, page, executor.submit(get_page, *shard, page, include_top_up)))
+                        while len(pending) >= workers * 2:
+                            yield from resolve()
+                while pending:
+                    yield from resolve()
+
+        if self.progress:
+            with Progress() as progress:
+                yield from ordered(progress)
+        else:
+            yield from ordered()
 
     def get_record(self, start, end, page, include_top_up=False):
-        url = URLS["records"]
+        """获取一页交易记录，返回 (dict 列表, 总页数)"""
+        return self.request_page(parse_records, start, end, page, include_top_up)
+
+    def get_page(self, start, end, page, include_top_up=False):
+        """获取一页交易记录，返回 (元组列表, 总页数)"""
+        return self.request_page(parse_rows, start, end, page, include_top_up)
+
+    def request_page(self, parse, start, end, page, include_top_up=False):
+        """
+        在限速和自适应并发上限内获取并解析一页，出错或页面不完整时退避后重试
+        :param parse: 解析函数，parse_rows 或 parse_records
+        """
+        if self.page_cache is not None:
+            html = self.page_cache.get(start, end, page, include_top_up)
+            if html is not None:
+                try:
+                    result = self.parse_html(parse, html)
+                    timings.count('cached_pages')
+                    return result
+                except InvalidPage:
+                    self.page_cache.discard(start, end, page, include_top_up)
+
+        error = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self.throttle.count('retries')
+                time.sleep(self.retry_delay(attempt, error))
+            try:
+                return self.throttle.call(self.parse_page, parse, start, end, page, include_top_up)
+            except InvalidPage as e:
+                self.throttle.count('invalid')
+                error = e
+            except requests.exceptions.RequestException as e:
+                self.throttle.count('errors')
+                error = e
+        raise ConnectionError(f"[获取失败] 第 {page} 页重试 {self.retries} 次后仍然失败: {error}")
+
+    def retry_delay(self, attempt, error):
+        """第 attempt 次重试前等待的秒数: 服务器给出 Retry-After 时遵循它，否则指数退避"""
+        delay = retry_after(getattr(error, 'response', None))
+        return self.backoff * 2 ** (attempt - 1) if delay is None else delay
+
+    def parse_page(self, parse, start, end, page, include_top_up=False):
+        html = self.fetch_page(start, end, page, include_top_up)
+        result = self.parse_html(parse, html)
+        if self.page_cache is not None:
+            # 只缓存完整的页面
+            self.page_cache.put(html, start, end, page, include_top_up)
+        return result
+
+    def parse_html(self, parse, html):
+        with timings.timer('parse_ms'):
+            records, cnt = parse(html)
+        timings.count('records', len(records))
+        return records, cnt
+
+    def fetch_page(self, start, end, page, include_top_up=False):
+        url = self.urls["records"]
         data = {
             "pageNo": page,
             "tabNo": "1",
-            "pager.offset": (page - 1) * 10,
+            "pager.offset": (page - 1) * PAGE_SIZE,
             "tradename": "",
             "starttime": start,
             "endtime": end,
@@ -99,54 +375,10 @@ class Fetcher:
         }
         if not include_top_up:
             data["tradedirect"] = "1"
-        headers = {
-            "Cookie": self.cookie
-        }
-        s = requests.session()
-        response = s.post(url, data=data, headers=headers)
-        soup = BeautifulSoup(response.text, 'html.parser')
-
-        res = []
-        page_cnt = 1
-        willend = False
-
-        block_words = ['现金', '交易成功', '详情']
-
-        for tr in soup.find_all('tr'):
-            end = False
-            record = {}
-
-            for td in tr.find_all('td'):
-                text = ''.join(td.text.split())
-
-                if '当前' in text or (willend and '创建时间' in text):
-                    end = True
-                if '创建时间' in text:
-                    willend = True
-                    break
-                if '当前' in text:
-                    page_cnt = int(re.findall('\\d+', text)[1])
-                    break
-
-                if re.match('\\d+\\.\\d+\\.\\d+', text):
-                    day = text.replace('.', '-')[0:10]
-                    time = text[10:12] + ':' + text[12:14] + ':' + text[14:16]
-                    record['time'] = day + ' ' + time
-                elif re.match('.*交易号：\\d+', text):
-                    record['id'] = re.search('20\\d+', text).group()
-                    record['type'] = re.findall('.*交易号', text)[0].replace('交易号', '')
-                elif re.match('\\d+\\.\\d+', text):
-                    record['amount'] = text
-                # -11.00为冲正类型，退款到卡内
-                elif re.match('-\\d+\\.\\d+', text):
-                    record['amount'] = text
-                elif text not in block_words:
-                    record['place'] = text
-
-            if end:
-                break
-
-            if not record == {}:
-                res.append(record)
-
-        return res, page_cnt
+        with timings.timer('request_ms'):
+            response = self.session.post(url, data=data, timeout=self.timeout)
+        timings.count('pages')
+        timings.count('bytes', len(response.content))
+        if response.status_code in RETRY_STATUS:
+            response.raise_for_status()
+        return response.text
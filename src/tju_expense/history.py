@@ -0,0 +1,223 @@
+#
+# Created on Sun Oct 18 2026
+#
+# Copyright (c) 2026 Super Lee
+#
+
+import hashlib
+import json
+import pandas as pd
+
+from datetime import date, timedelta
+from rich.console import Console
+from tju_expense.chunked import ChunkedDataset
+from tju_expense.constants import FIELDS, FORMATS
+from tju_expense.rollup import Rollups
+from tju_expense.store import load_records, normalize_records, save_records
+
+
+console = Console()
+
+
+def parse_date(text):
+    return date.fromisoformat(str(text)[:10])
+
+
+def merge_ranges(ranges):
+    """合并重叠或相邻的日期区间，区间为闭区间 [开始, 结束]"""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + timedelta(days=1):
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def month_range(start, end):
+    """区间覆盖的月份，格式为 2024-03"""
+    months = []
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        months.append(f"{year}-{month:02d}")
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+class HistoryStore:
+    """
+    按月分区保存一个用户的全部交易记录
+    history/index.json 记录已完整获取的日期区间和每个分区的交易号，
+    查询时只读取涉及的分区，同步时只向服务器请求缺失的区间
+    history/rollups/ 保存每个分区的预聚合结果，随新记录增量更新
+    """
+
+    def __init__(self, user_dir, fmt='csv'):
+        self.dir = user_dir / 'history'
+        self.rollup_dir = self.dir / 'rollups'
+        self.rollup_dir.mkdir(parents=True, exist_ok=True)
+        self.suffix = FORMATS[fmt]
+        self.index_file = self.dir / 'index.json'
+        self.covered = []
+        self.partitions = {}
+        self.load_index()
+
+    def load_index(self):
+        try:
+            index = json.loads(self.index_file.read_text(encoding='utf-8'))
+        except (FileNotFoundError, ValueError):
+            return
+        self.covered = [[parse_date(start), parse_date(end)] for start, end in index.get('covered', [])]
+        self.partitions = index.get('partitions', {})
+        # 已有分区沿用创建时的格式
+        self.suffix = index.get('suffix', self.suffix)
+
+    def save_index(self):
+        index = {
+            'suffix': self.suffix,
+            'covered': [[start.isoformat(), end.isoformat()] for start, end in self.covered],
+            'partitions': self.partitions,
+        }
+        tmp = self.index_file.with_name(self.index_file.name + '.tmp')
+        tmp.write_text(json.dumps(index, ensure_ascii=False), encoding='utf-8')
+        tmp.replace(self.index_file)
+
+    def partition_path(self, month):
+        return self.dir / f"{month}{self.suffix}"
+
+    def rollup_path(self, month):
+        return self.rollup_dir / f"{month}.pkl"
+
+    def month_rollups(self, month):
+        """分区的预聚合结果，缺失时由分区数据重新计算并保存"""
+        if month not in self.partitions:
+            return None
+        path = self.rollup_path(month)
+        rollups = Rollups.load(path)
+        if rollups is None and self.partition_path(month).exists():
+            rollups = Rollups.from_frame(load_records(self.partition_path(month)))
+            rollups.save(path)
+        return rollups
+
+    def gaps(self, start, end):
+        """[start, end] 中尚未完整获取的日期区间"""
+        start, end = parse_date(start), parse_date(end)
+        gaps = []
+        cursor = start
+        for covered_start, covered_end in self.covered:
+            if covered_end < cursor or covered_start > end:
+                continue
+            if covered_start > cursor:
+                gaps.append((cursor, covered_start - timedelta(days=1)))
+            cursor = max(cursor, covered_end + timedelta(days=1))
+            if cursor > end:
+                break
+        if cursor <= end:
+            gaps.append((cursor, end))
+        return gaps
+
+    def add(self, df, start, end, today=None):
+        """
+        写入 [start, end] 内获取到的全部交易记录，按交易号去重
+        今天及以后的日期还可能有新交易，不计入已完整获取的区间
+        :return: 新增的记录数
+        """
+        today = today or date.today()
+        added = 0
+        if not df.empty:
+            df = normalize_records(df)
+            for month, part in df.groupby(df['time'].dt.strftime('%Y-%m')):
+                info = self.partitions.setdefault(month, {'ids': [], 'count': 0})
+                known = set(info['ids'])
+                part = part[part['id'].isna() | ~part['id'].isin(known)]
+                part = part[part['id'].isna() | ~part['id'].duplicated()]
+                if part.empty:
+                    continue
+                path = self.partition_path(month)
+                rollups = Rollups.from_frame(part)
+                if path.exists():
+                    previous = self.month_rollups(month)
+                    if previous is not None:
+                        rollups = Rollups.merge([previous, rollups])
+                    part = pd.concat([load_records(path), part], ignore_index=True)
+                save_records(part[FIELDS], path)
+                rollups.save(self.rollup_path(month))
+                ids = part['id'].dropna().astype(str)
+                added += len(part) - info['count']
+                info['ids'] = sorted(set(ids))
+                info['count'] = len(part)
+
+        complete_end = min(parse_date(end), today - timedelta(days=1))
+        if parse_date(start) <= complete_end:
+            self.covered = merge_ranges(self.covered + [[parse_date(start), complete_end]])
+        self.save_index()
+        return added
+
+    def sync(self, fetcher, start, end, today=None):
+        """只向服务器请求 [start, end] 中缺失的区间，返回新增的记录数"""
+        added = 0
+        for gap_start, gap_end in self.gaps(start, end):
+            console.log(f"正在获取 {gap_start} ~ {gap_end} 的数据...")
+            batch = fetcher.get_batch(start=gap_start.isoformat(), end=gap_end.isoformat())
+            added += self.add(batch.to_frame(), gap_start, gap_end, today)
+        return added
+
+    def query(self, start, end):
+        """读取 [start, end] 内的交易记录，只读取涉及的月份分区"""
+        start, end = parse_date(start), parse_date(end)
+        parts = []
+        for month in month_range(start, end):
+            path = self.partition_path(month)
+            if month in self.partitions and path.exists():
+                parts.append(load_records(path))
+        if not parts:
+            return normalize_records(pd.DataFrame(columns=FIELDS))
+        df = normalize_records(pd.concat(parts, ignore_index=True))
+        day = df['time'].dt.normalize()
+        mask = (day >= pd.Timestamp(start)) & (day <= pd.Timestamp(end))
+        return df[mask].reset_index(drop=True)
+
+    def rollups(self, start, end):
+        """
+        [start, end] 的预聚合结果: 完整的月份直接读取保存的结果，
+        只有首尾不完整的月份才读取记录，读取量不超过两个月的交易
+        """
+        start, end = parse_date(start), parse_date(end)
+        parts = []
+        for month in month_range(start, end):
+            if month not in self.partitions:
+                continue
+            period = pd.Period(month, freq='M')
+            first, last = period.start_time.date(), period.end_time.date()
+            if start > first or end < last:
+                records = self.query(max(start, first), min(end, last))
+                rollups = Rollups.from_frame(records) if not records.empty else None
+            else:
+                rollups = self.month_rollups(month)
+            if rollups is not None and not rollups.empty:
+                parts.append(rollups)
+        return Rollups.merge(parts) if parts else None
+
+    def statistics(self, start, end):
+        """[start, end] 的统计结果，没有记录时返回 None"""
+        rollups = self.rollups(start, end)
+        return rollups.statistics() if rollups is not None else None
+
+    def digest(self, start, end):
+        """[start, end] 涉及的分区中交易号的哈希，分区有新记录时随之变化"""
+        start, end = parse_date(start), parse_date(end)
+        state = {
+            'range': [start.isoformat(), end.isoformat()],
+            'months': {
+                month: self.partitions[month]['ids']
+                for month in month_range(start, end) if month in self.partitions
+            },
+        }
+        return hashlib.sha256(json.dumps(state, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def dataset(self, start, end):
+        """
+        [start, end] 的报告数据，统计表格和图表都由预聚合结果得到，不在内存中保留区间内的全部记录
+        :return: ChunkedDataset
+        """
+        return ChunkedDataset(self.rollups(start, end), self.digest(start, end))
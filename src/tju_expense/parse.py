@@ -0,0 +1,110 @@
+#
+# Created on Sun Oct 18 2026
+#
+# Copyright (c) 2026 Super Lee
+#
+
+import re
+import sys
+
+from bs4 import BeautifulSoup, SoupStrainer
+from tju_expense.constants import FIELDS, PAGE_SIZE
+
+try:
+    import lxml  # noqa: F401
+    PARSER = 'lxml'
+except ImportError:
+    PARSER = 'html.parser'
+
+TIME_PATTERN = re.compile(r'\d+\.\d+\.\d+')
+TRADE_PATTERN = re.compile(r'.*交易号：\d+')
+TYPE_PATTERN = re.compile(r'.*交易号')
+ID_PATTERN = re.compile(r'20\d+')
+# -11.00为冲正类型，退款到卡内
+AMOUNT_PATTERN = re.compile(r'-?\d+\.\d+')
+DIGITS_PATTERN = re.compile(r'\d+')
+
+BLOCK_WORDS = frozenset(['现金', '交易成功', '详情'])
+
+ROWS = SoupStrainer('tr')
+
+
+class InvalidPage(ValueError):
+    """页面不完整或不是交易记录页面，例如服务器过载时返回的缺少分页信息的页面"""
+
+
+# parse_rows 产出的元组中各字段的位置，与 FIELDS 的顺序相同
+TIME, ID, TYPE, AMOUNT, PLACE = range(5)
+
+
+def parse_rows(html):
+    """
+    解析 consume/query 页面中的交易记录表格
+    :param html: 页面源码
+    :return: (交易记录元组列表, 总页数)，元组字段顺序与 FIELDS 相同，缺失的字段为 None
+    :raises InvalidPage: 有交易记录却没有分页信息，或者找不到查询表单；
+                         不满一页且表格正常结束的页面只能是最后一页，与原先的解析逻辑一样按一页处理
+    """
+    soup = BeautifulSoup(html, PARSER, parse_only=ROWS)
+
+    res = []
+    page_cnt = 1
+    willend = False
+    pager = False
+    closed = False
+
+    for tr in soup.find_all('tr'):
+        end = False
+        record = [None] * 5
+
+        for td in tr.find_all('td'):
+            text = ''.join(td.get_text().split())
+
+            if '创建时间' in text:
+                # 记录之后的第二个"创建时间"表示表格已经结束
+                closed = willend
+                end = willend or '当前' in text
+                pager = pager or '当前' in text
+                willend = True
+                break
+            if '当前' in text:
+                end = True
+                pager = True
+                page_cnt = int(DIGITS_PATTERN.findall(text)[1])
+                break
+
+            if TIME_PATTERN.match(text):
+                day = text.replace('.', '-')[0:10]
+                time = text[10:12] + ':' + text[12:14] + ':' + text[14:16]
+                record[TIME] = day + ' ' + time
+            elif TRADE_PATTERN.match(text):
+                record[ID] = ID_PATTERN.search(text).group()
+                # 类型和地点的取值很少，驻留后所有记录共用同一个字符串对象
+                record[TYPE] = sys.intern(TYPE_PATTERN.match(text).group().replace('交易号', ''))
+            elif AMOUNT_PATTERN.match(text):
+                record[AMOUNT] = text
+            elif text not in BLOCK_WORDS:
+                record[PLACE] = sys.intern(text)
+
+        if end:
+            break
+
+        if record != [None] * 5:
+            res.append(tuple(record))
+
+    # 没有记录的查询结果也没有分页信息，但仍然包含查询表单
+    if not pager and (res or not willend) and not (closed and len(res) < PAGE_SIZE):
+        raise InvalidPage(f"页面缺少分页信息 (解析到 {len(res)} 条记录)")
+
+    return res, page_cnt
+
+
+def parse_records(html):
+    """
+    解析 consume/query 页面中的交易记录表格
+    :param html: 页面源码
+    :return: (交易记录, 总页数)
+    """
+    rows, page_cnt = parse_rows(html)
+    records = [{field: value for field, value in zip(FIELDS, row) if value is not None} for row in rows]
+    return records, page_cnt
@@ -0,0 +1,171 @@
+#
+# Created on Sun Oct 18 2026
+#
+# Copyright (c) 2026 Super Lee
+#
+
+import pickle
+import numpy as np
+import pandas as pd
+
+from tju_expense.dataset import SLOT_BINS, TIME_SLOTS, UTILITY_PATTERN, scatter_points, thin_scatter
+from tju_expense.stats import EXTREMES, Statistics, find_extremes, tie_key
+from tju_expense.timings import timings
+
+# 保存的预聚合结果的格式版本，结构变化时旧文件视为不存在，由分区数据重新计算
+VERSION = 3
+
+
+def merge_tables(tables):
+    """按索引把多个 count/sum 表相加"""
+    tables = [table for table in tables if not table.empty]
+    if not tables:
+        return None
+    if len(tables) == 1:
+        return tables[0]
+    return pd.concat(tables).groupby(level=0, sort=True).sum()
+
+
+def extreme_key(row, column):
+    if column == 'seconds':
+        time = row['time']
+        return time.hour * 3600 + time.minute * 60 + time.second
+    return row[column]
+
+
+def is_better(row, best, column, func):
+    """row 是否比 best 更极端，取值相同时与 find_extremes 一样比较 tie_key"""
+    key, best_key = extreme_key(row, column), extreme_key(best, column)
+    if key != best_key:
+        return key < best_key if func == 'idxmin' else key > best_key
+    return tie_key(row) > tie_key(best)
+
+
+class Rollups:
+    """
+    可合并的预聚合结果: 每日、每个地点、每种类型、每个小时的 count/sum、极值记录以及抽稀后的散点
+    统计结果和图表只由这些表得到，计算量与天数而不是交易笔数成正比
+    """
+
+    def __init__(self, daily, types, places, hours, extremes, scatter):
+        self.daily = daily  # 日期 -> rows/count/sum
+        self.types = types  # 类型 -> count/sum
+        self.places = places  # 地点 -> count/sum，只含食堂消费
+        self.hours = hours  # 小时 -> count/sum，只含食堂消费
+        self.extremes = extremes  # 名称 -> {'amount', 'time', 'place', 'id'} 或 None
+        self.scatter = scatter  # 散点图的 (时刻, 金额) 数组，点数过多时已抽稀
+        self.version = VERSION
+
+    @classmethod
+    def from_frame(cls, df):
+        """由 normalize_records 之后的交易记录计算"""
+        timings.count('rows', len(df))
+        time = df['time']
+        date = time.dt.normalize().rename('date')
+        daily = df['amount'].groupby(date).agg(['size', 'count', 'sum']).rename(columns={'size': 'rows'})
+
+        is_utility = df['type'].str.contains(UTILITY_PATTERN, na=False)
+        frame = df.assign(seconds=(time - date) // pd.Timedelta(seconds=1))
+        pos = frame[~is_utility]
+
+        return cls(
+            daily=daily,
+            types=df.groupby('type', observed=True)['amount'].agg(['count', 'sum']),
+            places=pos.groupby('place', observed=True)['amount'].agg(['count', 'sum']),
+            hours=pos['amount'].groupby(pos['time'].dt.hour.rename('hour')).agg(['count', 'sum']),
+            extremes=find_extremes(frame, pos),
+            scatter=thin_scatter(*scatter_points(df)),
+        )
+
+    @classmethod
+    def merge(cls, rollups):
+        """
+        合并多段记录的预聚合结果，与各段的顺序无关
+        极值相同时与 find_extremes 一样取时间最晚的记录，合并结果与一次性计算相同
+        """
+        rollups = list(rollups)
+        extremes = {}
+        for name, _, column, func in EXTREMES:
+            best = None
+            for rollup in rollups:
+                row = rollup.extremes.get(name)
+                if row is None:
+                    continue
+                if best is None or is_better(row, best, column, func):
+                    best = row
+            extremes[name] = best
+
+        tables = {}
+        for name in ('daily', 'types', 'places', 'hours'):
+            merged = merge_tables([getattr(rollup, name) for rollup in rollups])
+            if merged is None:
+                merged = getattr(rollups[0], name) if rollups else pd.DataFrame(columns=['count', 'sum'])
+            tables[name] = merged
+        scatter = thin_scatter(
+            np.concatenate([rollup.scatter[0] for rollup in rollups] or [np.empty(0)]),
+            np.concatenate([rollup.scatter[1] for rollup in rollups] or [np.empty(0)]),
+        )
+        return cls(extremes=extremes, scatter=scatter, **tables)
+
+    @property
+    def empty(self):
+        return self.daily.empty
+
+    def statistics(self):
+        """由预聚合结果得到与 compute_statistics 相同结构的统计结果"""
+        daily = self.daily
+        timings.count('rollup_days', len(daily))
+        dates = pd.DatetimeIndex(daily.index)
+        total = daily['sum'].sum()
+
+        by_day = pd.DataFrame({
+            'amount': daily['sum'].to_numpy(),
+            'weekday': dates.weekday,
+            'week': dates.isocalendar().week.to_numpy(),
+        })
+        monthly = daily[['count', 'sum']].groupby(dates.to_period('M').rename('month')).sum()
+
+        hours = self.hours
+        slot = pd.cut(hours.index, bins=SLOT_BINS, labels=list(TIME_SLOTS), right=False)
+        slots = hours.groupby(slot, observed=False).sum()
+        slots = slots.reindex(list(TIME_SLOTS), fill_value=0)
+        slots.index.name = 'slot'
+
+        types = self.types.copy()
+        types['mean'] = types['sum'] / types['count']
+
+        return Statistics(
+            total=total,
+            count=int(daily['rows'].sum()),
+            mean=total / daily['count'].sum(),
+            daily_average=daily['sum'].mean(),
+            daily=daily['sum'].rename('amount'),
+            heatmap=by_day.pivot_table(
+                values='amount',
+                index='weekday',
+                columns='week',
+                aggfunc='sum',
+                fill_value=0
+            ),
+            types=types,
+            monthly=monthly,
+            slots=slots,
+            places=self.places['sum'].rename('amount'),
+            extremes=self.extremes,
+        )
+
+    def save(self, path):
+        tmp = path.with_name(path.name + '.tmp')
+        with open(tmp, 'wb') as f:
+            pickle.dump(self, f)
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path):
+        """文件不存在、无法读取或版本不同时返回 None"""
+        try:
+            with open(path, 'rb') as f:
+                rollups = pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError, AttributeError, ValueError):
+            return None
+        return rollups if getattr(rollups, 'version', None) == VERSION else None
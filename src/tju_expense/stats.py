@@ -0,0 +1,212 @@
+#
+# Created on Sun Oct 18 2026
+#
+# Copyright (c) 2026 Super Lee
+#
+
+import pandas as pd
+
+from dataclasses import dataclass
+from rich.console import Console
+from rich.table import Table
+from tju_expense.dataset import TIME_SLOTS, load_dataset
+from tju_expense.timings import timings
+
+
+console = Console()
+
+# (名称, 是否只看食堂消费, 列, 取最小/最大)
+EXTREMES = [
+    ("最大单笔消费", False, 'amount', 'idxmax'),
+    ("最大食堂单笔消费", True, 'amount', 'idxmax'),
+    ("最小单笔消费", False, 'amount', 'idxmin'),
+    ("最小食堂单笔消费", True, 'amount', 'idxmin'),
+    ("年度第一笔消费", False, 'time', 'idxmin'),
+    ("年度最后一笔消费", False, 'time', 'idxmax'),
+    ("每日最早消费", False, 'seconds', 'idxmin'),
+    ("每日最晚消费", False, 'seconds', 'idxmax'),
+    ("每日最早食堂消费", True, 'seconds', 'idxmin'),
+    ("每日最晚食堂消费", True, 'seconds', 'idxmax'),
+]
+
+
+@dataclass
+class Statistics:
+    """统计表格和图表共用的聚合结果"""
+    total: float
+    count: int
+    mean: float
+    daily_average: float
+    daily: object  # 每日消费总额 Series，索引为日期
+    heatmap: object  # 星期 × ISO 周的消费总额 DataFrame
+    types: object  # 每种类型的 count/sum/mean DataFrame
+    monthly: object  # 每月的 count/sum DataFrame，索引为 Period
+    slots: object  # 各时段食堂消费的 count/sum DataFrame
+    places: object  # 各地点食堂消费总额 Series
+    extremes: dict  # 名称 -> {'amount', 'time', 'place', 'id'}，没有对应记录时为 None
+
+    def to_dict(self):
+        """转换为只包含内置类型的字典，可以直接序列化为 JSON"""
+        def rows(table, key):
+            return [{key: str(index), **values} for index, values in zip(table.index, table.to_dict('records'))]
+
+        return {
+            'total': float(self.total),
+            'count': int(self.count),
+            'mean': float(self.mean),
+            'daily_average': float(self.daily_average),
+            'daily': {day.strftime('%Y-%m-%d'): float(amount) for day, amount in self.daily.items()},
+            'heatmap': [
+                {'weekday': int(weekday), 'week': int(week), 'amount': float(amount)}
+                for (weekday, week), amount in self.heatmap.stack().items()
+            ],
+            'types': rows(self.types, 'type'),
+            'monthly': rows(self.monthly, 'month'),
+            'slots': rows(self.slots, 'slot'),
+            'places': {str(place): float(amount) for place, amount in self.places.items()},
+            'extremes': {
+                name: None if row is None else {
+                    'amount': float(row['amount']),
+                    'time': row['time'].isoformat(sep=' '),
+                    'place': row['place'] if isinstance(row['place'], str) else None,
+                    'id': None if pd.isna(row.get('id')) else str(row['id']),
+                }
+                for name, row in self.extremes.items()
+            },
+        }
+
+
+def tie_key(row):
+    """极值相同时比较的键: 时间最晚、交易号最大的记录优先，与记录的先后顺序无关"""
+    record_id = row['id']
+    return row['time'], '' if pd.isna(record_id) else str(record_id)
+
+
+def find_extremes(df, pos):
+    """
+    每个极值只比较一列，时刻按当天的秒数比较
+    取值相同的记录中选 tie_key 最大的一条，分块或按月计算后合并的结果与一次性计算相同
+    """
+    extremes = {}
+    for name, only_pos, column, func in EXTREMES:
+        frame = pos if only_pos else df
+        values = frame[column]
+        target = values.min() if func == 'idxmin' else values.max()
+        candidates = frame[values == target]
+        if candidates.empty:
+            extremes[name] = None
+            continue
+        row = candidates.sort_values(['time', 'id'], na_position='first').iloc[-1]
+        extremes[name] = {'amount': row['amount'], 'time': row['time'], 'place': row['place'], 'id': row['id']}
+    return extremes
+
+
+def compute_statistics(data):
+    """一次性计算 Dataset 的全部统计结果"""
+    df, pos = data.df, data.pos
+    timings.count('rows', len(df))
+    daily = df.groupby('date')['amount'].sum()
+
+    slots = pos.groupby('slot', observed=False)['amount'].agg(['count', 'sum'])
+    slots = slots.reindex(list(TIME_SLOTS), fill_value=0)
+
+    return Statistics(
+        total=df['amount'].sum(),
+        count=len(df),
+        mean=df['amount'].mean(),
+        daily_average=daily.mean(),
+        daily=daily,
+        heatmap=df.pivot_table(
+            values='amount',
+            index='weekday',
+            columns='week',
+            aggfunc='sum',
+            fill_value=0
+        ),
+        types=df.groupby('type', observed=True)['amount'].agg(['count', 'sum', 'mean']),
+        monthly=df.groupby('month')['amount'].agg(['count', 'sum']),
+        slots=slots,
+        places=pos.groupby('place', observed=True)['amount'].sum(),
+        extremes=find_extremes(df, pos),
+    )
+
+
+def print_statistics(data, console=console):
+    """打印基本统计信息"""
+    data = load_dataset(data)
+    if data.empty:
+        console.log("没有数据")
+        return None
+    stats = data.statistics
+
+    # 创建表格
+    table = Table(title="消费统计")
+
+    # 添加列
+    table.add_column("统计项", justify="left", style="cyan", no_wrap=True)
+    table.add_column("数值", justify="right", style="magenta")
+
+    # 添加行
+    table.add_row("总消费金额", f"{stats.total:.2f}元")
+    table.add_row("平均每日消费", f"{stats.daily_average:.2f}元")
+    table.add_row("平均每笔消费", f"{stats.mean:.2f}元")
+    table.add_row("消费笔数", f"{stats.count}笔")
+
+    console.print(table, justify="center")
+
+    # 消费类型统计
+    type_stats = stats.types.round(2)
+    type_table = Table(title="消费类型统计")
+
+    # 添加列
+    type_table.add_column("类型", justify="left", style="cyan", no_wrap=True)
+    type_table.add_column("笔数", justify="right", style="magenta")
+    type_table.add_column("总金额", justify="right", style="magenta")
+    type_table.add_column("平均金额", justify="right", style="magenta")
+
+    # 添加行
+    for index, row in type_stats.iterrows():
+        type_table.add_row(index, str(row['count']), f"{row['sum']:.2f}元", f"{row['mean']:.2f}元")
+
+    console.print(type_table, justify="center")
+
+    # 每月消费统计
+    monthly_stats = stats.monthly.reset_index()
+    monthly_table = Table(title="每月消费统计")
+    monthly_table.add_column("月份", justify="left", style="cyan", no_wrap=True)
+    monthly_table.add_column("消费笔数", justify="right", style="magenta")
+    monthly_table.add_column("总金额", justify="right", style="magenta")
+
+    for index, row in monthly_stats.iterrows():
+        monthly_table.add_row(f"{row['month'].month}月", str(row['count']), f"{row['sum']:.2f}元")
+
+    console.print(monthly_table, justify="center")
+
+    # 时段消费统计
+    time_slot_table = Table(title="时段消费统计")
+    time_slot_table.add_column("时段", justify="left", style="cyan", no_wrap=True)
+    time_slot_table.add_column("消费笔数", justify="right", style="magenta")
+    time_slot_table.add_column("总金额", justify="right", style="magenta")
+    time_slot_table.add_column("平均金额", justify="right", style="magenta")
+
+    for slot, row in stats.slots.iterrows():
+        avg_amount = row['sum'] / row['count'] if row['count'] > 0 else 0
+        time_slot_table.add_row(slot, str(row['count']), f"{row['sum']:.2f}元", f"{avg_amount:.2f}元")
+
+    console.print(time_slot_table, justify="center")
+
+    # 单笔消费
+    transaction_table = Table(title="单笔消费极值")
+    transaction_table.add_column("类型", justify="left", style="cyan", no_wrap=True)
+    transaction_table.add_column("金额", justify="right", style="magenta")
+    transaction_table.add_column("时间", justify="left", style="magenta")
+    transaction_table.add_column("地点", justify="left", style="magenta")
+
+    for name, transaction in stats.extremes.items():
+        if transaction is None:
+            continue
+        transaction_table.add_row(name, f"{transaction['amount']:.2f}元", str(transaction['time']), transaction['place'])
+
+    console.print(transaction_table, justify="center")
+
+    return True
@@ -0,0 +1,325 @@
+#
+# Created on Sun Oct 18 2026
+#
+# Copyright (c) 2026 Super Lee
+#
+
+import csv
+import json
+import threading
+import pandas as pd
+
+from datetime import date
+from pathlib import Path
+
+from rich.console import Console
+from tju_expense.constants import FIELDS, FORMATS
+from tju_expense.timings import timings
+
+
+console = Console()
+
+
+def read_records(path):
+    """读取 CSV 中的原始交易记录，交易号按字符串读取以免丢失精度"""
+    try:
+        return pd.read_csv(path, dtype={'id': str})
+    except (FileNotFoundError, pd.errors.EmptyDataError):
+        return pd.DataFrame()
+
+
+def normalize_records(df):
+    """统一列类型：时间为 datetime64，金额为浮点数，交易号为字符串，地点和类型为分类"""
+    df = df.reindex(columns=list(dict.fromkeys(FIELDS + list(df.columns))))
+    df['time'] = pd.to_datetime(df['time'])
+    df['amount'] = pd.to_numeric(df['amount'], errors='coerce').astype('float64')
+    df['id'] = df['id'].astype('string')
+    df['type'] = df['type'].astype('category')
+    df['place'] = df['place'].astype('category')
+    return df
+
+
+def load_records(path):
+    """按扩展名读取本地保存的交易记录，返回列类型统一的 DataFrame"""
+    path = Path(path)
+    suffix = path.suffix
+    with timings.timer('read_ms'):
+        if suffix == '.parquet':
+            df = pd.read_parquet(path)
+        elif suffix == '.feather':
+            df = pd.read_feather(path)
+        else:
+            df = read_records(path)
+        return normalize_records(df)
+
+
+def iter_record_chunks(path, chunksize=100000):
+    """
+    按块读取本地保存的交易记录，每块最多 chunksize 行，列类型与 load_records 相同
+    CSV 和 parquet 逐块读取，内存占用与文件大小无关；feather 不支持分块，一次读取后再切分
+    """
+    path = Path(path)
+    suffix = path.suffix
+    if suffix == '.parquet':
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            yield normalize_records(batch.to_pandas())
+    elif suffix == '.feather':
+        df = load_records(path)
+        for start in range(0, len(df), chunksize):
+            yield df.iloc[start:start + chunksize]
+    else:
+        try:
+            reader = pd.read_csv(path, dtype={'id': str}, chunksize=chunksize)
+        except (FileNotFoundError, pd.errors.EmptyDataError):
+            return
+        with reader:
+            for chunk in reader:
+                yield normalize_records(chunk)
+
+
+def save_records(df, path):
+    """按扩展名保存交易记录，parquet/feather 需要安装 pyarrow"""
+    path = Path(path)
+    suffix = path.suffix
+    with timings.timer('write_ms'):
+        if suffix == '.parquet':
+            normalize_records(df).to_parquet(path, index=False)
+        elif suffix == '.feather':
+            normalize_records(df).reset_index(drop=True).to_feather(path)
+        else:
+            df.to_csv(path, index=False, encoding='utf-8')
+
+
+def sync_records(fetcher, path, start, end, today=None):
+    """
+    增量同步交易记录：只获取本地最新一笔记录当天及之后、今天及之前的数据，按交易号去重后追加保存
+    :param fetcher: 已登录的 Fetcher
+    :param path: 本地数据文件
+    :param start: 开始日期，格式为2022-03-30
+    :param end: 结束日期，格式为2022-03-30
+    :param today: 今天的日期，默认为 date.today()
+    :return: 新增的记录数
+    """
+    path = Path(path)
+    # 今天之后还没有交易，按月分片时这些月份也会各自请求一次
+    end = min(end, today or date.today().strftime("%Y-%m-%d"))
+    local = load_records(path)
+    since = start
+    if local['time'].notna().any():
+        # 最新一天可能只同步了一部分，从当天重新获取，再按交易号去重
+        since = max(start, local['time'].max().strftime('%Y-%m-%d'))
+
+    fetched = fetcher.get_batch(start=since, end=end).to_frame()
+    if fetched.empty:
+        return 0
+    fetched = fetched[~fetched['id'].isin(local['id'].dropna())]
+    if fetched.empty:
+        return 0
+
+    if path.suffix == '.csv' and not local.empty:
+        fetched.reindex(columns=local.columns).to_csv(path, mode='a', header=False, index=False, encoding='utf-8')
+    else:
+        save_records(pd.concat([local, fetched], ignore_index=True), path)
+    return len(fetched)
+
+
+class RecordWriter:
+    """将 parse_rows 产出的交易记录元组逐页写入 CSV，每页写完立即刷新到磁盘"""
+
+    def __init__(self, path, append=False):
+        self.path = path
+        exists = append and path.exists() and path.stat().st_size > 0
+        self.file = open(path, 'a' if append else 'w', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.file)
+        if not exists:
+            self.writer.writerow(FIELDS)
+        self.count = 0
+
+    def write(self, records):
+        with timings.timer('write_ms'):
+            self.writer.writerows(records)
+            self.file.flush()
+        self.count += len(records)
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Checkpoint:
+    """
+    记录一次查询中每个按月分片已写入磁盘的页码，用于中断后只获取缺失的页面
+    只记录调用过 resume 的分片，包含今天的分片每次都完整获取
+    """
+
+    def __init__(self, path, start, end, include_top_up=False):
+        self.path = path
+        self.query = {"start": start, "end": end, "include_top_up": include_top_up}
+        self.shards = {}  # "开始:结束" -> {"page_cnt": 总页数, "done": 已完成的页码}
+        self.lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        try:
+            state = json.loads(self.path.read_text(encoding='utf-8'))
+        except (FileNotFoundError, ValueError):
+            return
+        if state.get("query") != self.query:
+            return
+        self.shards = {
+            key: {"page_cnt": shard.get("page_cnt"), "done": set(shard.get("done", []))}
+            for key, shard in state.get("shards", {}).items()
+        }
+
+    def save(self):
+        state = {
+            "query": self.query,
+            "shards": {
+                key: {"page_cnt": shard["page_cnt"], "done": sorted(shard["done"])}
+                for key, shard in self.shards.items()
+            },
+        }
+        tmp = self.path.with_name(self.path.name + '.tmp')
+        tmp.write_text(json.dumps(state), encoding='utf-8')
+        tmp.replace(self.path)
+
+    @property
+    def resumable(self):
+        """是否有已完成的页面"""
+        return any(shard["done"] for shard in self.shards.values())
+
+    def reset(self):
+        self.shards = {}
+
+    def resume(self, shard, page_cnt):
+        """作为 Fetcher.iter_shards 的 resume 回调，返回该分片已完成的页码"""
+        key = ":".join(shard)
+        with self.lock:
+            state = self.shards.get(key)
+            if state is not None and state["page_cnt"] != page_cnt:
+                # 分页按偏移量计算，总页数变化说明旧页面已经错位，这个分片只能从头开始
+                console.log(f"{shard[0]} ~ {shard[1]} 的总页数已从 {state['page_cnt']} 变为 {page_cnt}, 重新获取")
+                state = None
+            if state is None:
+                state = self.shards[key] = {"page_cnt": page_cnt, "done": set()}
+            self.save()
+            return set(state["done"])
+
+    def mark(self, shard, page):
+        key = ":".join(shard)
+        if key in self.shards:
+            self.shards[key]["done"].add(page)
+            self.save()
+
+    def clear(self):
+        self.path.unlink(missing_ok=True)
+
+
+def crawl_records(fetcher, path, start, end, include_top_up=False):
+    """
+    按月分片边获取边写入交易记录，全部完成后才生成目标文件，中断时最多丢失一页
+    同目录下的 .checkpoint 文件记录每个分片已完成的页码，重新运行时只获取缺失的页面
+    :return: 保存的记录数
+    """
+    from tju_expense.fetch import is_new
+    from tju_expense.parse import ID
+
+    part = path.with_suffix('.csv.part')
+    checkpoint = Checkpoint(path.with_name(path.name + '.checkpoint'), start, end, include_top_up)
+    resumed = part.exists() and checkpoint.resumable
+    if resumed:
+        console.log(f"从断点继续, 已完成 {sum(len(shard['done']) for shard in checkpoint.shards.values())} 页")
+    else:
+        checkpoint.reset()
+
+    # 当月的分片错位时会重复获取同一条记录，写入前按交易号去重
+    seen = set()
+    with RecordWriter(part, append=resumed) as writer:
+        for shard, page, records in fetcher.iter_shards(start, end, include_top_up, rows=True,
+                                                         resume=checkpoint.resume):
+            writer.write([record for record in records if is_new(record[ID], seen)])
+            checkpoint.mark(shard, page)
+
+    if resumed or path.suffix != '.csv':
+        df = read_records(part)
+        if resumed and 'id' in df:
+            # 断点之前写入的记录不在 seen 中，写入和记录页码之间中断时同一页也可能被写入两次
+            df = df[df['id'].isna() | ~df.duplicated('id')]
+        save_records(df, path)
+        part.unlink()
+        count = len(df)
+    else:
+        part.replace(path)
+        count = writer.count
+
+    checkpoint.clear()
+    return count
+
+
+def find_records(user_dir, name):
+    """查找任意格式的已保存数据文件，不存在时返回 None"""
+    for suffix in FORMATS.values():
+        path = user_dir / f"{name}{suffix}"
+        if path.exists():
+            return path
+    return None
+
+
+def read_synced(user_dir, year):
+    """year 年的数据最后一次与服务器同步的日期，没有记录时返回 None"""
+    try:
+        return (user_dir / f"{year}.synced").read_text(encoding='utf-8').strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def write_synced(user_dir, year, today):
+    """记录 year 年的数据在 today 与服务器同步过，与数据文件的格式无关"""
+    (user_dir / f"{year}.synced").write_text(today, encoding='utf-8')
+
+
+def prepare_records(fetcher, user_dir, year, fmt='csv', today=None, refresh=False):
+    """
+    确保 user_dir 下有 year 年的数据文件并返回其路径
+    年份结束后同步过的数据直接使用，否则增量同步，其他格式的数据直接转换，缺失时完整获取
+    :param refresh: 忽略本地数据重新获取，Fetcher 启用 PageCache 时只重新解析缓存的页面
+    """
+    today = today or date.today().strftime("%Y-%m-%d")
+    start, end = f"{year}-01-01", f"{year}-12-31"
+    path = user_dir / f"{year}{FORMATS[fmt]}"
+
+    existing = None if refresh else find_records(user_dir, year)
+    if not path.exists() and existing is not None:
+        # 已有其他格式的数据时直接转换, 无需重新获取
+        save_records(load_records(existing), path)
+        console.log(f"已将 {existing} 转换为 {path}")
+
+    # 当前年份只请求到今天为止，避免为以后的月份发送请求
+    fetch_end = min(end, today)
+    if refresh:
+        count = crawl_records(fetcher, path, start, fetch_end)
+        console.log(f"已重新获取 {count} 条数据并保存到 {path}")
+    elif path.exists() and (read_synced(user_dir, year) or '') > end:
+        # 年份结束之后同步过，本地数据已经完整
+        console.log(f"数据已经存在: {path}\n")
+    elif path.exists():
+        # 最后一次同步时统计年份尚未结束, 只同步本地最新记录之后的交易
+        console.log(f"数据已经存在: {path}, 正在同步新的交易记录...")
+        added = sync_records(fetcher, path, start, fetch_end, today)
+        console.log(f"新增 {added} 条交易记录\n")
+    else:
+        count = crawl_records(fetcher, path, start, fetch_end)
+        console.log(f"{count} 条数据已保存到 {path}")
+        stats = fetcher.get_connection_stats()
+        console.log(f"[dim]共发送 {stats['requests']} 次请求, 新建连接 {stats['opened']} 个, 复用 {stats['reused']} 次")
+        throttle = fetcher.get_throttle_stats()
+        console.log(f"[dim]重试 {throttle['retries']} 次 (不完整页面 {throttle['invalid']} 个, 请求出错 {throttle['errors']} 次), "
+                    f"限速等待 {throttle['waited']:.1f}s, 并发数最低降至 {throttle['lowest']}")
+    write_synced(user_dir, year, today)
+    return path
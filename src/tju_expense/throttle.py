@@ -0,0 +1,138 @@
+#
+# Created on Sun Oct 18 2026
+#
+# Copyright (c) 2026 Super Lee
+#
+
+import threading
+import time
+
+from dataclasses import asdict, dataclass
+
+
+class TokenBucket:
+    """
+    令牌桶限速: 平均每秒最多 rate 次请求，允许短时间内连续发出 burst 次
+    :param rate: 每秒补充的令牌数，为 None 时不限速
+    :param burst: 桶的容量，默认与 rate 相同（至少为 1）
+    """
+
+    def __init__(self, rate=None, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1, rate or 1)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """取出一个令牌，返回等待的秒数"""
+        if not self.rate:
+            return 0.0
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class AdaptiveLimiter:
+    """
+    AIMD 自适应并发: 每次请求成功时上限增加 1/上限，失败或明显变慢时上限减半
+    同一批并发请求的失败只减半一次
+    :param limit: 初始并发上限
+    :param minimum: 并发上限的下限
+    :param maximum: 并发上限的上限，默认与初始值相同
+    :param slow: 响应时间超过平滑后响应时间的多少倍视为变慢
+    :param threshold: 响应时间不超过这么多秒时不算变慢，避免毫秒级的波动触发降速
+    """
+
+    def __init__(self, limit, minimum=1, maximum=None, slow=3.0, threshold=1.0):
+        self.limit = float(limit)
+        self.minimum = minimum
+        self.maximum = maximum or limit
+        self.slow = slow
+        self.threshold = threshold
+        self.active = 0
+        self.latency = None  # 成功请求响应时间的指数移动平均
+        self.decreased = time.monotonic()
+        self.lowest = self.limit
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        """等待空闲的并发名额，返回请求开始的时刻"""
+        with self.condition:
+            while self.active >= int(self.limit):
+                self.condition.wait()
+            self.active += 1
+            return time.monotonic()
+
+    def release(self, started, ok=True):
+        latency = time.monotonic() - started
+        with self.condition:
+            self.active -= 1
+            slow = self.latency is not None and latency > max(self.threshold, self.slow * self.latency)
+            if ok:
+                # 变慢但成功的响应也计入平均，服务器稳定在更高的响应时间后不再一直视为变慢
+                self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+            if ok and not slow:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            elif started > self.decreased:
+                # 上次减半之后才开始的请求失败，说明服务器仍然过载
+                self.limit = max(self.minimum, self.limit / 2)
+                self.decreased = time.monotonic()
+                self.lowest = min(self.lowest, self.limit)
+            self.condition.notify_all()
+
+
+@dataclass
+class ThrottleStats:
+    requests: int = 0  # 发出的页面请求数
+    retries: int = 0  # 重新请求的次数
+    invalid: int = 0  # 不完整或无效的页面数
+    errors: int = 0  # 连接失败或服务器出错的次数
+    waited: float = 0.0  # 因限速等待的总秒数
+
+
+class Throttle:
+    """
+    Fetcher 发出页面请求前的限速和并发控制，并统计重试次数
+    :param workers: 最大并发数
+    :param rate: 每秒最多请求数，为 None 时不限速
+    :param burst: 允许连续发出的请求数
+    """
+
+    def __init__(self, workers, rate=None, burst=None):
+        self.bucket = TokenBucket(rate, burst)
+        self.limiter = AdaptiveLimiter(workers)
+        self.stats = ThrottleStats()
+        self.lock = threading.Lock()
+
+    def count(self, name, value=1):
+        with self.lock:
+            setattr(self.stats, name, getattr(self.stats, name) + value)
+
+    def call(self, func, *args):
+        """在限速和并发上限内调用 func，抛出异常时视为失败"""
+        self.count('waited', self.bucket.acquire())
+        started = self.limiter.acquire()
+        self.count('requests')
+        ok = False
+        try:
+            result = func(*args)
+            ok = True
+            return result
+        finally:
+            self.limiter.release(started, ok)
+
+    def get_stats(self):
+        stats = asdict(self.stats)
+        stats['concurrency'] = int(self.limiter.limit)
+        stats['lowest'] = int(self.limiter.lowest)
+        return stats
@@ -0,0 +1,118 @@
+#
+# Created on Sun Oct 18 2026
+#
+# Copyright (c) 2026 Super Lee
+#
+
+import importlib
+import json
+import threading
+import time
+
+from contextlib import contextmanager
+
+
+class Timings:
+    """
+    记录启动、模块导入和各阶段的耗时，以及各阶段的计数器
+    计数器由获取、解析、读写和绘图等环节累加，如 pages、bytes、records、parse_ms
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.records = []  # (阶段, 开始时刻, 耗时)
+        self.counters = {}
+        self.lock = threading.Lock()
+        self.profile_stage = None  # 用 cProfile 分析的阶段
+        self.profile_file = None
+        self.profiled = False  # profile_stage 是否运行过并保存了结果
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    def add(self, name, seconds, start=None):
+        if start is None:
+            start = self.elapsed() - seconds
+        self.records.append((name, start, seconds))
+
+    def count(self, name, value=1):
+        """累加计数器，可以在多个线程中调用"""
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    @contextmanager
+    def timer(self, name):
+        """将代码块的耗时（毫秒）累加到计数器 name"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.count(name, (time.perf_counter() - start) * 1000)
+
+    def enable_profile(self, stage, path):
+        """对名为 stage 的阶段启用 cProfile，结果保存到 path，可用 pstats 或 snakeviz 查看"""
+        self.profile_stage = stage
+        self.profile_file = path
+
+    @contextmanager
+    def stage(self, name):
+        profiler = None
+        if name == self.profile_stage:
+            import cProfile
+            profiler = cProfile.Profile()
+            profiler.enable()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start, start - self.start)
+            if profiler is not None:
+                profiler.disable()
+                profiler.dump_stats(str(self.profile_file))
+                self.profiled = True
+
+    def load(self, module):
+        """导入模块并记录耗时，已导入的模块耗时接近 0"""
+        with self.stage(f"import {module}"):
+            return importlib.import_module(module)
+
+    def to_dict(self):
+        trace = {
+            'total_ms': self.elapsed() * 1000,
+            'stages': [
+                {'name': name, 'start_ms': start * 1000, 'ms': seconds * 1000}
+                for name, start, seconds in self.records
+            ],
+            'counters': dict(self.counters),
+        }
+        if self.profiled:
+            trace['profile'] = {'stage': self.profile_stage, 'file': str(self.profile_file)}
+        return trace
+
+    def save(self, path):
+        """保存为 JSON 格式的耗时记录"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+
+    def print(self, console):
+        from rich.table import Table
+
+        table = Table(title="耗时统计")
+        table.add_column("阶段", justify="left", style="cyan", no_wrap=True)
+        table.add_column("耗时", justify="right", style="magenta")
+        for name, _, seconds in self.records:
+            table.add_row(name, f"{seconds * 1000:.0f}ms")
+        table.add_row("总计", f"{self.elapsed() * 1000:.0f}ms", style="bold")
+        console.print(table, justify="center")
+
+        if self.counters:
+            counter_table = Table(title="计数器")
+            counter_table.add_column("项目", justify="left", style="cyan", no_wrap=True)
+            counter_table.add_column("数值", justify="right", style="magenta")
+            for name, value in sorted(self.counters.items()):
+                counter_table.add_row(name, f"{value:.0f}" if isinstance(value, float) else str(value))
+            console.print(counter_table, justify="center")
+
+
+# 进程内共用的计时器，在 __main__ 最先导入以便统计启动耗时
+timings = Timings()
@@ -0,0 +1,43 @@
+#
+# Created on Sun Oct 18 2026
+#
+# Copyright (c) 2026 Super Lee
+#
+
+"""
+api 接受文档中列出的各种输入：Dataset、DataFrame、str 或 Path 形式的数据文件路径
+"""
+
+import pandas as pd
+import pytest
+
+from tju_expense import api
+
+RECORDS = [
+    {'time': '2024-03-01 07:31:05', 'id': '202403010731050001', 'type': '消费', 'amount': 6.5, 'place': '第一食堂'},
+    {'time': '2024-03-01 12:02:41', 'id': '202403011202410002', 'type': '消费', 'amount': 14.0, 'place': '第二食堂'},
+    {'time': '2024-03-02 18:15:00', 'id': '202403021815000003', 'type': '冲正', 'amount': -11.0, 'place': '第一食堂'},
+    {'time': '2024-04-10 11:45:30', 'id': '202404101145300004', 'type': '消费', 'amount': 22.5, 'place': '学一食堂'},
+    {'time': '2024-04-11 09:00:00', 'id': '202404110900000005', 'type': '电费', 'amount': 50.0, 'place': '电控'},
+    {'time': '2024-05-20 20:20:20', 'id': '202405202020200006', 'type': '消费', 'amount': 8.0, 'place': '第二食堂'},
+]
+
+
+@pytest.fixture
+def csv_file(tmp_path):
+    path = tmp_path / 'records.csv'
+    pd.DataFrame(RECORDS).to_csv(path, index=False)
+    return path
+
+
+def test_get_statistics_accepts_str_path(csv_file):
+    expected = api.get_statistics(api.load_dataset(csv_file))
+    assert api.get_statistics(str(csv_file)) == expected
+    assert api.get_statistics(csv_file) == expected
+
+
+def test_load_chunked_accepts_str_path(csv_file):
+    data = api.load_chunked(str(csv_file), chunksize=2)
+    assert data.rows == len(RECORDS)
+    assert data.digest == api.load_dataset(csv_file).digest
+    assert api.get_statistics(data) == api.get_statistics(str(csv_file))
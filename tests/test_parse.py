@@ -0,0 +1,124 @@
+#
+# Created on Sun Oct 18 2026
+#
+# Copyright (c) 2026 Super Lee
+#
+
+"""
+parse_records 与原先 Fetcher.get_record 中逐行解析的结果相同
+fixtures/ 中的页面由 benchmarks/mock_server.py 的模板生成，并非从校园卡网站保存，包含冲正、充值、最后一页、
+空结果和没有分页信息的单页结果（原先的解析逻辑遇到第二个"创建时间"时结束）
+"""
+
+import re
+
+from pathlib import Path
+
+import pytest
+from bs4 import BeautifulSoup
+
+from tju_expense import parse
+from tju_expense.parse import InvalidPage, parse_records, parse_rows
+
+FIXTURES = Path(__file__).parent / 'fixtures'
+PAGES = sorted(FIXTURES.glob('query_*.html'))
+
+BACKENDS = ['html.parser']
+try:
+    import lxml  # noqa: F401
+    BACKENDS.append('lxml')
+except ImportError:
+    pass
+
+
+def legacy_get_record(html):
+    """原先 Fetcher.get_record 中的解析逻辑"""
+    soup = BeautifulSoup(html, 'html.parser')
+
+    res = []
+    page_cnt = 1
+    willend = False
+
+    block_words = ['现金', '交易成功', '详情']
+
+    for tr in soup.find_all('tr'):
+        end = False
+        record = {}
+
+        for td in tr.find_all('td'):
+            text = ''.join(td.text.split())
+
+            if '当前' in text or (willend and '创建时间' in text):
+                end = True
+            if '创建时间' in text:
+                willend = True
+                break
+            if '当前' in text:
+                page_cnt = int(re.findall('\\d+', text)[1])
+                break
+
+            if re.match('\\d+\\.\\d+\\.\\d+', text):
+                day = text.replace('.', '-')[0:10]
+                time = text[10:12] + ':' + text[12:14] + ':' + text[14:16]
+                record['time'] = day + ' ' + time
+            elif re.match('.*交易号：\\d+', text):
+                record['id'] = re.search('20\\d+', text).group()
+                record['type'] = re.findall('.*交易号', text)[0].replace('交易号', '')
+            elif re.match('\\d+\\.\\d+', text):
+                record['amount'] = text
+            # -11.00为冲正类型，退款到卡内
+            elif re.match('-\\d+\\.\\d+', text):
+                record['amount'] = text
+            elif text not in block_words:
+                record['place'] = text
+
+        if end:
+            break
+
+        if not record == {}:
+            res.append(record)
+
+    return res, page_cnt
+
+
+@pytest.fixture(params=BACKENDS)
+def backend(request, monkeypatch):
+    monkeypatch.setattr(parse, 'PARSER', request.param)
+    return request.param
+
+
+@pytest.mark.parametrize('page', PAGES, ids=[page.stem for page in PAGES])
+def test_same_as_legacy_parser(page, backend):
+    html = page.read_text(encoding='utf-8')
+    assert parse_records(html) == legacy_get_record(html)
+
+
+def test_fixture_contents():
+    records, page_cnt = parse_records((FIXTURES / 'query_first.html').read_text(encoding='utf-8'))
+    assert page_cnt == 3
+    assert len(records) == 10
+    assert any(record['amount'] == '-11.00' for record in records)
+
+    records, page_cnt = parse_records((FIXTURES / 'query_empty.html').read_text(encoding='utf-8'))
+    assert (records, page_cnt) == ([], 1)
+
+
+def test_missing_pager_is_invalid(backend):
+    html = (FIXTURES / 'query_first.html').read_text(encoding='utf-8')
+    truncated = re.sub(r'<tr><td colspan="7">当前.*?</tr>', '', html)
+    # 满一页的记录后面可能还有其他页面，缺少分页信息时无法确定总页数
+    with pytest.raises(InvalidPage):
+        parse_rows(truncated)
+
+
+def test_single_page_without_pager(backend):
+    html = (FIXTURES / 'query_single_no_pager.html').read_text(encoding='utf-8')
+    records, page_cnt = parse_records(html)
+    assert page_cnt == 1
+    assert len(records) == 3
+
+
+def test_unclosed_page_is_invalid(backend):
+    html = (FIXTURES / 'query_single_no_pager.html').read_text(encoding='utf-8')
+    with pytest.raises(InvalidPage):
+        parse_rows(html[:html.index('</tbody>')])
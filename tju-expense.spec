@@ -10,7 +10,20 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=[('src/tju_expense/LXGWWenKaiLite-Regular.ttf', 'tju_expense')],
-    hiddenimports=[],
+    # __main__ 通过 importlib 延迟导入这些模块，需要显式声明
+    hiddenimports=[
+        'tju_expense.analyze',
+        'tju_expense.api',
+        'tju_expense.batch',
+        'tju_expense.chunked',
+        'tju_expense.cache',
+        'tju_expense.cohort',
+        'tju_expense.fetch',
+        'tju_expense.history',
+        'tju_expense.rollup',
+        'tju_expense.stats',
+        'tju_expense.store',
+    ],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],